@@ -0,0 +1,157 @@
+from collections import defaultdict
+
+from metrics import metrics
+from summary_cache import summary_key
+
+
+class BatchSummarizer:
+    """
+    Summarizes many articles at once by batching chunks across articles.
+
+    Every article is tokenized once and split into token-ID chunks; chunks
+    from all articles are grouped by their generation lengths, sorted by token
+    count (so each padded batch is as tight as possible) and fed straight to
+    `model.generate` together. Chunk summaries are then reassembled per
+    article and the combine pass is batched the same way. With a `cache`,
+    every generation already done for the same model, input and lengths is
+    reused instead of re-run.
+    """
+
+    def __init__(self, model, tokenizer, chunk_text, fallback,
+                 chunk_lengths, combine_lengths, batch_size=8, max_chunks=None,
+                 always_combine=False, min_tokens=50,
+                 chunk_fallback_sentences=1, combine_fallback_sentences=2,
+                 cache=None, model_id=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.chunk_text = chunk_text
+        self.fallback = fallback
+        self.chunk_lengths = chunk_lengths
+        self.combine_lengths = combine_lengths
+        self.batch_size = batch_size
+        self.max_chunks = max_chunks
+        self.always_combine = always_combine
+        self.min_tokens = min_tokens
+        self.chunk_fallback_sentences = chunk_fallback_sentences
+        self.combine_fallback_sentences = combine_fallback_sentences
+        self.max_input_tokens = tokenizer.model_max_length - tokenizer.num_special_tokens_to_add()
+        self.cache = cache
+        self.model_id = model_id or getattr(model, "name_or_path", type(model).__name__)
+
+    def _generate(self, batch_ids, max_length, min_length):
+        """Run one padded batch of token-ID lists through the model and decode the summaries."""
+        import torch
+
+        inputs = [self.tokenizer.build_inputs_with_special_tokens(ids) for ids in batch_ids]
+        width = max(len(ids) for ids in inputs)
+        pad_id = self.tokenizer.pad_token_id
+        input_ids = torch.full((len(inputs), width), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(inputs), width), dtype=torch.long)
+        for row, ids in enumerate(inputs):
+            input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, :len(ids)] = 1
+
+        with torch.inference_mode():
+            output_ids = self.model.generate(
+                input_ids=input_ids.to(self.model.device),
+                attention_mask=attention_mask.to(self.model.device),
+                max_length=max_length, min_length=min_length, do_sample=False,
+            )
+        return [text.strip() for text in self.tokenizer.batch_decode(output_ids, skip_special_tokens=True)]
+
+    def _fallback(self, ids, num_sentences, reason):
+        # Only fallbacks need the chunk as text
+        metrics.count("summarize.fallbacks", reason=reason)
+        return self.fallback(self.tokenizer.decode(ids, skip_special_tokens=True), num_sentences=num_sentences)
+
+    def _timed_generate(self, batch, max_length, min_length, stage):
+        # Only successful batches count towards tokens/s and chunks/s
+        with metrics.timer("summarize.generate", stage=stage):
+            summaries = self._generate([ids for _, ids in batch], max_length, min_length)
+        metrics.count("summarize.generated", len(batch), stage=stage)
+        metrics.count("summarize.tokens", sum(len(ids) for _, ids in batch), stage=stage)
+        return summaries
+
+    def _store(self, cache_keys, key, summary):
+        if self.cache is not None:
+            self.cache.put(cache_keys[key], summary)
+
+    def _run(self, jobs, lengths, fallback_sentences, stage):
+        """
+        Summarize `jobs` ((key, token_ids) pairs) in padded batches, with
+        generation lengths given by `lengths(token_count)`.
+        Returns {key: summary}; failed items fall back to the extractive summary.
+        """
+        results = {}
+        cache_keys = {}
+        groups = defaultdict(list)
+        for key, ids in jobs:
+            max_length, min_length = lengths(len(ids))
+            if self.cache is not None:
+                cache_keys[key] = summary_key(self.model_id, ids, max_length, min_length)
+                cached = self.cache.get(cache_keys[key])
+                if cached is not None:
+                    metrics.count("summarize.cache_hits", stage=stage)
+                    results[key] = cached
+                    continue
+            groups[(max_length, min_length)].append((key, ids))
+
+        for (max_length, min_length), group in groups.items():
+            group.sort(key=lambda job: len(job[1]))
+            for start in range(0, len(group), self.batch_size):
+                batch = group[start:start + self.batch_size]
+                print(f"Summarizing batch of {len(batch)} texts "
+                      f"({len(batch[0][1])}-{len(batch[-1][1])} tokens, max_length={max_length}, min_length={min_length})")
+                try:
+                    summaries = self._timed_generate(batch, max_length, min_length, stage)
+                    for (key, _), summary in zip(batch, summaries):
+                        results[key] = summary
+                        self._store(cache_keys, key, summary)
+                except Exception as e:
+                    # Retry one by one so a single bad input doesn't sink the whole batch
+                    print(f"Batch failed ({e}); retrying items individually.")
+                    for key, ids in batch:
+                        try:
+                            results[key] = self._timed_generate([(key, ids)], max_length, min_length, stage)[0]
+                            self._store(cache_keys, key, results[key])
+                        except Exception as item_error:
+                            print(f"Error summarizing {key}: {item_error}. Using fallback.")
+                            results[key] = self._fallback(ids, fallback_sentences, "error")
+        return results
+
+    def summarize_many(self, articles):
+        """
+        Summarize `articles` ({key: text}) and return {key: summary}.
+        """
+        chunk_summaries = {}
+        jobs = []
+        chunk_counts = {}
+        for key, text in articles.items():
+            with metrics.timer("summarize.chunking"):
+                chunks, token_counts = self.chunk_text(text)
+            if self.max_chunks is not None:
+                chunks, token_counts = chunks[:self.max_chunks], token_counts[:self.max_chunks]
+            chunk_counts[key] = len(chunks)
+            metrics.count("summarize.chunks", len(chunks))
+            print(f"Article '{key}': {len(chunks)} chunk(s), token counts = {token_counts}")
+            for idx, (ids, token_count) in enumerate(zip(chunks, token_counts)):
+                if token_count < self.min_tokens:
+                    # Too short for the model
+                    chunk_summaries[(key, idx)] = self._fallback(ids, self.chunk_fallback_sentences, "short")
+                else:
+                    jobs.append(((key, idx), ids))
+
+        chunk_summaries.update(self._run(jobs, self.chunk_lengths, self.chunk_fallback_sentences, "chunk"))
+
+        summaries = {}
+        combine_jobs = []
+        for key in articles:
+            parts = [chunk_summaries[(key, idx)] for idx in range(chunk_counts[key])]
+            if len(parts) > 1 or (self.always_combine and parts):
+                combined_ids = self.tokenizer.encode(" ".join(parts), add_special_tokens=False)
+                combine_jobs.append((key, combined_ids[:self.max_input_tokens]))
+            else:
+                summaries[key] = parts[0] if parts else ""
+
+        summaries.update(self._run(combine_jobs, self.combine_lengths, self.combine_fallback_sentences, "combine"))
+        return summaries
@@ -0,0 +1,53 @@
+import re
+from bisect import bisect_left
+
+# Sentence boundary: end punctuation followed by whitespace and a plausible sentence start
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+
+
+def sentence_starts(text):
+    """Character offsets at which sentences begin."""
+    return [0] + [match.end() for match in SENTENCE_BOUNDARY.finditer(text)]
+
+
+def chunk_text(text, tokenizer, max_tokens=1024, overlap_sentences=1):
+    """
+    Tokenizes `text` once and splits the token IDs into chunks of at most
+    `max_tokens` (room for the model's special tokens included).
+
+    Chunks end on sentence boundaries and the next chunk repeats the last
+    `overlap_sentences` sentences of the previous one; a single sentence
+    longer than a chunk is cut hard. Returns (list_of_token_id_lists,
+    list_of_token_counts), ready to be fed to the model without decoding.
+    """
+    budget = max_tokens - tokenizer.num_special_tokens_to_add()
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    token_ids = encoding["input_ids"]
+    if not token_ids:
+        return [], []
+    if len(token_ids) <= budget:
+        return [token_ids], [len(token_ids)]
+
+    # Map sentence start characters to token positions
+    token_starts = [start for start, _ in encoding["offset_mapping"]]
+    bounds = sorted({bisect_left(token_starts, char) for char in sentence_starts(text)} | {0})
+    sentences = [[start, end] for start, end in zip(bounds, bounds[1:] + [len(token_ids)]) if start < end]
+
+    chunks = []
+    i = 0
+    while i < len(sentences):
+        start = sentences[i][0]
+        j = i
+        while j < len(sentences) and sentences[j][1] - start <= budget:
+            j += 1
+        if j == i:
+            # Sentence longer than a whole chunk: cut it and continue with the remainder
+            chunks.append(token_ids[start:start + budget])
+            sentences[i][0] = start + budget
+            continue
+        chunks.append(token_ids[start:sentences[j - 1][1]])
+        if j == len(sentences):
+            break
+        i = max(j - overlap_sentences, i + 1)
+
+    return chunks, [len(chunk) for chunk in chunks]
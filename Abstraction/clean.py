@@ -1,11 +1,83 @@
+import argparse
+import os
 import re
-import json
-import spacy
+import sys
 
-# Load spaCy English model
-nlp = spacy.load("en_core_web_sm")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from result_store import iter_records, write_records
+from checkpoint import Checkpoint, content_hash, record_key
+from blob_store import default_store, is_ref, load_text, store_text
 
-def clean_text(text):
+# URLs, DOIs and publisher links, removed in two passes as before
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+|doi:\s*\S+", re.I)
+LINK_PATTERN = re.compile(r"https?://\S+|www\.\S+|doi:\s*\S+|\b(?:ncbi|pubmed|sciencedirect|springer|nature|elsevier|arxiv|jstor)\.\S+", re.I)
+
+# Keywords and patterns to remove metadata and irrelevant content
+metadata_keywords = [
+    "Journal", "Volume", "Issue", "Citations", "Open Access",
+    "Corresponding Author", "Search for more papers", "Department for Health",
+    "orcid", "bath.ac.uk", "©", "Special Issue"
+]
+# All keywords in one case-insensitive scan instead of one substring test each
+METADATA_PATTERN = re.compile("|".join(re.escape(keyword) for keyword in metadata_keywords), re.I)
+CITATION_PATTERN = re.compile(r"\[\d+(,\s*\d+)*\]|\(\d+(,\s*\d+)*\)|Fig\.? \d+|Figure \d+", re.I)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Sentence segmentation: "parser" reproduces the previous output exactly (the
+# tagger, lemmatizer and NER it never needed are left out); "senter" (the
+# model's statistical segmenter) and "sentencizer" (punctuation rules) are
+# faster but may split some sentences differently.
+SEGMENTER = "parser"
+UNUSED_COMPONENTS = ["tagger", "attribute_ruler", "lemmatizer", "ner"]
+
+# Texts per nlp.pipe batch, and spaCy worker processes
+PIPE_BATCH_SIZE = 32
+N_PROCESS = 1
+
+_nlp = {}
+
+def get_nlp(segmenter=SEGMENTER):
+    """Loads (once) the smallest spaCy pipeline that provides doc.sents for `segmenter`."""
+    if segmenter not in _nlp:
+        import spacy  # only when text is actually cleaned; it takes seconds to import
+        if segmenter == "parser":
+            nlp = spacy.load("en_core_web_sm", exclude=UNUSED_COMPONENTS)
+        elif segmenter == "senter":
+            nlp = spacy.load("en_core_web_sm", exclude=UNUSED_COMPONENTS + ["parser"])
+            nlp.enable_pipe("senter")
+        elif segmenter == "sentencizer":
+            nlp = spacy.blank("en")
+            nlp.add_pipe("sentencizer")
+        else:
+            raise ValueError(f"Unknown segmenter '{segmenter}'")
+        _nlp[segmenter] = nlp
+    return _nlp[segmenter]
+
+def strip_links(text):
+    # Remove URLs, DOIs, and unwanted links
+    text = URL_PATTERN.sub("", text)
+    return LINK_PATTERN.sub("", text)
+
+def filter_sentences(sentences):
+    """
+    Drops citations/figure references from each sentence and skips short or
+    metadata sentences, returning the cleaned text.
+    """
+    cleaned_sentences = []
+    for sentence in sentences:
+        # Remove in-text citations, figure references
+        sentence = CITATION_PATTERN.sub("", sentence.strip())
+
+        # Skip very short sentences or metadata-containing sentences
+        if len(sentence) < 20 or METADATA_PATTERN.search(sentence):
+            continue
+
+        cleaned_sentences.append(sentence)
+
+    # Join cleaned sentences into a single cleaned text
+    return WHITESPACE_PATTERN.sub(" ", " ".join(cleaned_sentences)).strip()
+
+def clean_text(text, segmenter=SEGMENTER):
     """
     Cleans the input text by:
     - Removing URLs, DOIs, and unwanted metadata.
@@ -14,66 +86,64 @@ def clean_text(text):
     """
     if not text:
         return ""
-    
-    # Remove URLs, DOIs, and unwanted links
-    text = re.sub(r"https?://\S+|www\.\S+|doi:\s*\S+", "", text, flags=re.I)
-    text = re.sub(r"https?://\S+|www\.\S+|doi:\s*\S+|\b(?:ncbi|pubmed|sciencedirect|springer|nature|elsevier|arxiv|jstor)\.\S+", "", text, flags=re.I)
+    doc = get_nlp(segmenter)(strip_links(text))
+    return filter_sentences(sent.text for sent in doc.sents)
 
+def clean_records(records, checkpoint=None, segmenter=SEGMENTER,
+                  batch_size=PIPE_BATCH_SIZE, n_process=N_PROCESS, store=None):
+    """
+    Yields the records that have full text, with "Cleaned Text Content" added
+    (as a reference into the blob store `store`, default blobs/, when long).
+    Texts already cleaned in an earlier (possibly interrupted) run are taken from the checkpoint,
+    which holds the same blob reference rather than a second copy of the text;
+    the rest are segmented together with nlp.pipe.
+    """
+    if checkpoint is None:
+        checkpoint = Checkpoint("clean")
+    store = store if store is not None else default_store()
 
-    # Process text with spaCy
-    doc = nlp(text)
-    cleaned_sentences = []
-    
-    # Keywords and patterns to remove metadata and irrelevant content
-    metadata_keywords = [
-        "Journal", "Volume", "Issue", "Citations", "Open Access",
-        "Corresponding Author", "Search for more papers", "Department for Health",
-        "orcid", "bath.ac.uk", "©", "Special Issue"
-    ]
-    citation_pattern = re.compile(r"\[\d+(,\s*\d+)*\]|\(\d+(,\s*\d+)*\)|Fig\.? \d+|Figure \d+", re.I)
-    
-    for sent in doc.sents:
-        sentence = sent.text.strip()
-        
-        # Remove in-text citations, figure references
-        sentence = citation_pattern.sub("", sentence)
-        
-        # Skip very short sentences or metadata-containing sentences
-        if len(sentence) < 20 or any(keyword.lower() in sentence.lower() for keyword in metadata_keywords):
-            continue
-        
-        cleaned_sentences.append(sentence)
-    
-    # Join cleaned sentences into a single cleaned text
-    cleaned_text = " ".join(cleaned_sentences)
-    cleaned_text = re.sub(r"\s+", " ", cleaned_text).strip()
-    
-    return cleaned_text
+    def pipe_inputs():
+        for entry in records:
+            # Ensure "full_abstract" exists
+            if "full_abstract" in entry and "Full Text Content" in entry["full_abstract"]:
+                raw_text = load_text(entry["full_abstract"]["Full Text Content"], store)
+                key, text_hash = record_key(entry), content_hash(raw_text or "")
+                cached = checkpoint.get(key, text_hash)
+                if is_ref(cached) and cached not in store:
+                    cached = None  # checkpointed against another blob store
+                # Checkpointed and empty texts go through the pipe as "" so output order is kept
+                text = strip_links(raw_text) if cached is None and raw_text else ""
+                yield text, (entry, key, text_hash, cached)
+
+    docs = get_nlp(segmenter).pipe(pipe_inputs(), as_tuples=True, batch_size=batch_size, n_process=n_process)
+    for doc, (entry, key, text_hash, cached) in docs:
+        if cached is None:
+            text = filter_sentences(sent.text for sent in doc.sents) if len(doc) else ""
+        else:
+            text = cached
+        cleaned_text_content = store_text(text, store)
+        # New texts, and long ones an older run checkpointed inline, are recorded by reference
+        if cleaned_text_content != cached:
+            checkpoint.record(key, text_hash, cleaned_text_content)
+        yield {**entry, "full_abstract": {**entry["full_abstract"],
+                                          "Cleaned Text Content": cleaned_text_content}}
 
-def process_json(input_file, output_file):
+def process_json(input_file, output_file, segmenter=SEGMENTER, n_process=N_PROCESS):
     """
-    Reads a JSON file, cleans the scholar text data, and writes the cleaned version to a new file.
+    Streams a results file, cleans the scholar text data, and writes the cleaned version to a new file.
     """
-    with open(input_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    cleaned_data = []
-    for entry in data:
-        # Ensure "full_abstract" exists
-        if "full_abstract" in entry and "Full Text Content" in entry["full_abstract"]:
-            cleaned_entry = entry.copy()
-            raw_text = entry["full_abstract"]["Full Text Content"]
-            cleaned_text_content = clean_text(raw_text)
-            cleaned_entry["full_abstract"]["Cleaned Text Content"] = cleaned_text_content
-            cleaned_data.append(cleaned_entry)
-    
-    # Save cleaned data
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(cleaned_data, f, indent=4, ensure_ascii=False)
-    
+    write_records(output_file, clean_records(iter_records(input_file), segmenter=segmenter, n_process=n_process))
+
     print(f"✅ Cleaned data saved to '{output_file}'")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean the full text of scraped articles.")
+    parser.add_argument("--input", default="../scholar_results.jsonl")
+    parser.add_argument("--output", default="scholar_results_clean.jsonl")
+    parser.add_argument("--segmenter", choices=["parser", "senter", "sentencizer"], default=SEGMENTER)
+    parser.add_argument("--n-process", type=int, default=N_PROCESS, help="spaCy worker processes")
+    args = parser.parse_args(argv)
+    process_json(args.input, args.output, segmenter=args.segmenter, n_process=args.n_process)
+
 if __name__ == "__main__":
-    input_file = "../scholar_results.json"  # Update this to the correct path
-    output_file = "scholar_results_clean.json"
-    process_json(input_file, output_file)
+    main()
@@ -0,0 +1,97 @@
+import re
+
+import numpy as np
+
+from chunking import SENTENCE_BOUNDARY
+
+WORD_PATTERN = re.compile(r"[a-z][a-z0-9\-]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had
+has have having he her here hers herself him himself his how i if in into is it its itself just
+me more most my myself no nor not now of off on once only or other our ours ourselves out over own
+same she should so some such than that the their theirs them themselves then there these they this
+those through to too under until up very was we were what when where which while who whom why will
+with would you your yours yourself yourselves et al
+""".split())
+
+# Sentences beyond this many are ignored when ranking, to bound the similarity matrix
+MAX_SENTENCES = 1500
+DAMPING = 0.85
+ITERATIONS = 50
+
+_punkt = None
+
+def _load_punkt():
+    """
+    NLTK's punkt model if it is already installed locally, else False. Never
+    downloads anything; the rule-based splitter is used without it. nltk 3.9
+    loads the punkt_tab data, so an old punkt download alone does not count.
+    """
+    global _punkt
+    if _punkt is None:
+        try:
+            import nltk
+            nltk.data.find("tokenizers/punkt_tab/english/")
+            from nltk.tokenize import sent_tokenize
+            _punkt = sent_tokenize
+        except (ImportError, LookupError):
+            _punkt = False
+    return _punkt
+
+def split_sentences(text):
+    punkt = _load_punkt()
+    if punkt:
+        try:
+            return punkt(text)
+        except LookupError:
+            pass
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+def rank_sentences(sentences):
+    """TextRank scores of `sentences` over their TF-IDF vectors (cosine similarity graph)."""
+    vocabulary = {}
+    rows = []
+    for sentence in sentences:
+        words = [w for w in WORD_PATTERN.findall(sentence.lower()) if w not in STOPWORDS]
+        rows.append([vocabulary.setdefault(w, len(vocabulary)) for w in words])
+
+    n = len(sentences)
+    if not vocabulary:
+        return np.zeros(n)
+    tf = np.zeros((n, len(vocabulary)))
+    for i, ids in enumerate(rows):
+        if ids:
+            tf[i] = np.bincount(ids, minlength=len(vocabulary))
+
+    df = np.count_nonzero(tf, axis=0)
+    tfidf = tf * (np.log((1 + n) / (1 + df)) + 1)
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf = np.divide(tfidf, norms, out=np.zeros_like(tfidf), where=norms > 0)
+
+    similarity = tfidf @ tfidf.T
+    np.fill_diagonal(similarity, 0.0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, out_weight, out=np.full_like(similarity, 1.0 / n), where=out_weight > 0)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(ITERATIONS):
+        updated = (1 - DAMPING) / n + DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+def extractive_summary(text, num_sentences=2):
+    """
+    The `num_sentences` most central sentences of `text` (TextRank over
+    TF-IDF), in their original order.
+    """
+    sentences = split_sentences(text)[:MAX_SENTENCES]
+    if len(sentences) <= num_sentences:
+        return " ".join(sentences)
+    scores = rank_sentences(sentences)
+    # Stable sort: ties keep the earlier sentence
+    best = sorted(np.argsort(-scores, kind="stable")[:num_sentences])
+    return " ".join(sentences[i] for i in best)
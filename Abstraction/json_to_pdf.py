@@ -1,64 +1,352 @@
-import json
-from fpdf import FPDF
+import argparse
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from result_store import iter_records
+from checkpoint import Checkpoint, content_hash, record_key
+
+REPORT_TITLE = "Exercise snacking Study"
+FONT_FAMILY = "DejaVu"
+FONT_PATH = "DejaVuSans.ttf"
+
+# Space taken by the page header, and the bottom margin pages break at (mm)
+HEADER_HEIGHT = 13
+BOTTOM_MARGIN = 15
+
+# (style, font size, line height) of each kind of line
+TITLE_STYLE = ("B", 12, 10)
+META_STYLE = ("", 9, 5)
+BODY_STYLE = ("", 10, 7)
+SECTION_STYLE = ("B", 14, 12)
+TOC_SECTION_STYLE = ("B", 11, 8)
+TOC_ENTRY_STYLE = ("", 10, 6)
+
+# Width of the page number column of the contents (mm)
+TOC_NUMBER_WIDTH = 14
+
+# Bump when the layout of an article changes, so cached fragments are redone
+LAYOUT_VERSION = 1
+
+MISSING_VALUES = {"", "N/A", "No Authors Found"}
+
+class OutputBuffer:
+    """
+    Append-only stand-in for fpdf's string output buffer. fpdf 1.7.2 grows
+    `self.buffer` with `+=` per PDF line, copying the whole document every
+    time; this keeps the parts in a list and joins them once on output.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.length = 0
+
+    def __iadd__(self, text):
+        self.parts.append(text)
+        self.length += len(text)
+        return self
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return "".join(self.parts)
+
+    def encode(self, *args):
+        return str(self).encode(*args)
+
+class ReportLayout:
+    """The report's layout on top of fpdf's FPDF; see new_pdf()."""
 
-class PDF(FPDF):
     def header(self):
         # Header on every page with the main title centered
-        self.set_font('DejaVu', 'B', 14)  # Smaller header font size
-        self.cell(0, 10, 'Exercise snacking Study', border=False, ln=1, align='C')
-        self.ln(3)
-        
-    def chapter_title(self, title):
-        # Title of each section
-        self.set_font('DejaVu', 'B', 12)  # Slightly smaller than before
-        self.multi_cell(0, 10, title)
-        self.ln(2)
-
-    def chapter_body(self, body):
-        # Abstract text with smaller font size to fit more content on a page
-        self.set_font('DejaVu', '', 10)
-        self.multi_cell(0, 7, body)
-        self.ln(3)
-
-def main():
-    input_file = "abstracts_gpu.json"
-    output_file = "Exercise_snacking_Study.pdf"
-    
-    # Load JSON data
-    with open(input_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    # Create PDF object and add a Unicode font
-    pdf = PDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    # Add the Unicode font (ensure the TTF file is in the same directory)
-    font_path = "DejaVuSans.ttf"
-    if not os.path.exists(font_path):
-        raise FileNotFoundError("DejaVuSans.ttf not found. Please download it and place it in the script directory.")
-    
-    pdf.add_font("DejaVu", "", font_path, uni=True)
-    pdf.add_font("DejaVu", "B", font_path, uni=True)
-    
+        self.set_font(FONT_FAMILY, 'B', 14)  # Smaller header font size
+        self.cell(0, 10, REPORT_TITLE, border=False, ln=1, align='C')
+        self.ln(HEADER_HEIGHT - 10)
+
+    def setup(self, font_path=FONT_PATH):
+        # Add the Unicode font (fpdf keeps its parsed metrics in a .pkl next to the TTF)
+        if not os.path.exists(font_path):
+            raise FileNotFoundError(f"{font_path} not found. Please download it and place it in the script directory.")
+        self.add_font(FONT_FAMILY, "", font_path, uni=True)
+        self.add_font(FONT_FAMILY, "B", font_path, uni=True)
+        # The .pkl may record the TTF relative to wherever it was first built; embed from font_path
+        for style in ("", "B"):
+            self.fonts[FONT_FAMILY.lower() + style]["ttffile"] = font_path
+        # Pages are broken by render() so they land exactly where paginate() predicted
+        self.set_auto_page_break(False, margin=BOTTOM_MARGIN)
+        self.text_width_limit = self.w - self.l_margin - self.r_margin - 2 * self.c_margin
+        self.body_top = self.t_margin + HEADER_HEIGHT
+        self.body_bottom = self.h - BOTTOM_MARGIN
+        self._widths = {}
+        if isinstance(getattr(self, 'buffer', None), str):
+            self.buffer = OutputBuffer()
+        # Fonts are fixed per file and layout; a different TTF or page size invalidates cached fragments
+        self.layout_id = [LAYOUT_VERSION, os.path.getsize(font_path), self.w, self.h, self.text_width_limit]
+
+    def text_width(self, text, style, size):
+        # Word widths are memoized: the same words recur across thousands of abstracts
+        key = (style, size, text)
+        width = self._widths.get(key)
+        if width is None:
+            self.set_font(FONT_FAMILY, style, size)
+            width = self._widths[key] = self.get_string_width(text)
+        return width
+
+    def wrap(self, text, style, size, width=None):
+        """Greedy word wrap of `text` into lines no wider than `width` (default: the text area)."""
+        width = width or self.text_width_limit
+        space = self.text_width(" ", style, size)
+        lines = []
+        for paragraph in text.split("\n"):
+            line, line_width = [], 0.0
+            for word in paragraph.split():
+                word_width = self.text_width(word, style, size)
+                if word_width > width:
+                    # Too long for any line (e.g. a URL): break it between characters
+                    if line:
+                        lines.append(" ".join(line))
+                    pieces = self._break_word(word, style, size, width)
+                    lines.extend(pieces[:-1])
+                    line, line_width = [pieces[-1]], self.text_width(pieces[-1], style, size)
+                elif line and line_width + space + word_width > width:
+                    lines.append(" ".join(line))
+                    line, line_width = [word], word_width
+                else:
+                    line_width += word_width + (space if line else 0)
+                    line.append(word)
+            if line:
+                lines.append(" ".join(line))
+        return lines
+
+    def _break_word(self, word, style, size, width):
+        pieces, piece, piece_width = [], "", 0.0
+        for char in word:
+            char_width = self.text_width(char, style, size)
+            if piece and piece_width + char_width > width:
+                pieces.append(piece)
+                piece, piece_width = "", 0.0
+            piece += char
+            piece_width += char_width
+        return pieces + [piece]
+
+    def render(self, ops):
+        """
+        Draws layout ops: ["text", style, size, height, text, url] lines and
+        ["space", height] gaps, starting a new page when a line doesn't fit.
+        """
+        for op in ops:
+            if op[0] == "space":
+                self.ln(op[1])
+                continue
+            _, style, size, height, text, url = op
+            self.break_page(height)
+            self.set_font(FONT_FAMILY, style, size)
+            self.cell(0, height, text, ln=1, link=url or '')
+
+    def _putfonts(self):
+        # fpdf 1.7.2 appends every character drawn to the font subset (duplicates
+        # included) and then scans that list once per code point when writing the
+        # widths, which took most of the run; deduplicate it first
+        for font in self.fonts.values():
+            if isinstance(font.get('subset'), list):
+                font['subset'] = list(dict.fromkeys(font['subset']))
+        super()._putfonts()
+
+    def break_page(self, height):
+        # Same rule as paginate()
+        if self.get_y() + height > self.body_bottom and self.get_y() > self.body_top:
+            self.add_page()
+
+_pdf_class = None
+
+def new_pdf():
+    """An empty report document. fpdf is imported here, on the first report built."""
+    global _pdf_class
+    if _pdf_class is None:
+        from fpdf import FPDF
+
+        class PDF(ReportLayout, FPDF):
+            pass
+        _pdf_class = PDF
+    return _pdf_class()
+
+def text_ops(pdf, text, line_style, url=None):
+    style, size, height = line_style
+    return [["text", style, size, height, line, url] for line in pdf.wrap(text, style, size)]
+
+def paginate(pdf, ops, y=None):
+    """
+    Pages `ops` span when drawn from height `y` (default: the top of a fresh
+    page), and the height they end at. Mirrors ReportLayout.render; every op but
+    "space" is one line of height op[3].
+    """
+    y = pdf.body_top if y is None else y
+    pages = 1
+    for op in ops:
+        if op[0] == "space":
+            y += op[1]
+            continue
+        height = op[3]
+        if y + height > pdf.body_bottom and y > pdf.body_top:
+            pages += 1
+            y = pdf.body_top
+        y += height
+    return pages, y
+
+def metadata_lines(meta):
+    authors = meta.get("author")
+    if isinstance(authors, list):
+        authors = ", ".join(authors)
+    details = []
+    if meta.get("publication_year"):
+        details.append(f"Year: {meta['publication_year']}")
+    if meta.get("citation_count") is not None:
+        details.append(f"Citations: {meta['citation_count']}")
+    lines = []
+    if authors and authors not in MISSING_VALUES:
+        lines.append(f"Authors: {authors}")
+    if details:
+        lines.append(" · ".join(details))
+    return lines
+
+def article_ops(pdf, entry, meta, fragments):
+    """
+    Layout ops of one article page (title, metadata, abstract) and whether
+    they came from the cache. Fragments are cached per article and only laid
+    out again when its content (or the page layout) changed.
+    """
+    title = entry.get("title", "No Title")
+    abstract = entry.get("abstract", "No abstract available.")
+    key = record_key(entry)
+    input_hash = content_hash([pdf.layout_id, title, abstract, meta])
+    ops = fragments.get(key, input_hash)
+    if ops is not None:
+        return ops, True
+    ops = text_ops(pdf, title, TITLE_STYLE) + [["space", 2]]
+    for line in metadata_lines(meta):
+        ops += text_ops(pdf, line, META_STYLE)
+    if meta.get("link"):
+        ops += text_ops(pdf, meta["link"], META_STYLE, url=meta["link"])
+    ops += [["space", 3]] + text_ops(pdf, abstract, BODY_STYLE) + [["space", 3]]
+    fragments.record(key, input_hash, ops)
+    return ops, False
+
+def load_metadata(results_file):
+    """{record key: authors, year, citations, link} from a scholar results file, without the full texts."""
+    if not results_file or not os.path.exists(results_file):
+        return {}
+    fields = ("author", "publication_year", "citation_count", "link")
+    return {record_key(r): {field: r.get(field) for field in fields} for r in iter_records(results_file)}
+
+def load_topics(embeddings_dir):
+    """{record key: topic label} from a semantic index (see semantic_index.py), if one was built."""
+    if not embeddings_dir or not os.path.exists(os.path.join(embeddings_dir, "meta.json")):
+        return {}
+    from semantic_index import SemanticIndex
+    index = SemanticIndex(embeddings_dir)
+    return {key: label for label, keys in index.topics().items() for key in keys}
+
+def toc_ops(pdf, sections):
+    """
+    Contents ops: ["toc", style, size, height, article] entries, one line per
+    article, between section labels. Page numbers are filled in when drawn and
+    never change the layout.
+    """
+    ops = text_ops(pdf, "Contents", SECTION_STYLE)
+    style, size, height = TOC_ENTRY_STYLE
+    for label, articles in sections:
+        ops += [["space", 2]] + text_ops(pdf, label, TOC_SECTION_STYLE)[:1]
+        ops += [["toc", style, size, height, article] for article in articles]
+    return ops
+
+def render_toc(pdf, ops):
+    title_width = pdf.text_width_limit - TOC_NUMBER_WIDTH
+    for op in ops:
+        if op[0] != "toc":
+            pdf.render([op])
+            continue
+        _, style, size, height, article = op
+        pdf.break_page(height)
+        # One line per entry: titles too long for it are cut with an ellipsis
+        title = article["title"].strip()
+        text = (pdf.wrap(title, style, size, title_width) or [""])[0]
+        if len(text) < len(title):
+            text += "…"
+        pdf.set_font(FONT_FAMILY, style, size)
+        pdf.cell(title_width, height, text, link=article["link"])
+        pdf.cell(TOC_NUMBER_WIDTH, height, str(article["page"]), ln=1, align='R', link=article["link"])
+
+def build_report(input_file, output_file, results_file=None, embeddings_dir=None, font_path=FONT_PATH):
+    """
+    Lays out every article (reusing cached fragments for unchanged ones),
+    groups them into topic sections, computes each article's page up front
+    so the table of contents can go first, then draws and saves the PDF.
+    """
+    pdf = new_pdf()
+    pdf.setup(font_path)
+    fragments = Checkpoint("pdf_layout")
+    metadata = load_metadata(results_file)
+    topics = load_topics(embeddings_dir)
+
+    sections = {}
+    reused = 0
+    for entry in iter_records(input_file):
+        key = record_key(entry)
+        ops, cached = article_ops(pdf, entry, metadata.get(key, {}), fragments)
+        reused += cached
+        label = topics.get(key, "Other articles" if topics else "Articles")
+        sections.setdefault(label, []).append({"title": entry.get("title", "No Title"), "ops": ops})
+    # Largest topics first, catch-all last
+    ordered = sorted(sections.items(), key=lambda item: (item[0] == "Other articles", -len(item[1])))
+    total = sum(len(articles) for _, articles in ordered)
+
+    # Page numbers: cover, contents, then every article on a new page, the first of a section under its heading
+    toc = toc_ops(pdf, ordered)
+    page = 2 + paginate(pdf, toc)[0]
+    for label, articles in ordered:
+        articles[0]["ops"] = text_ops(pdf, label, SECTION_STYLE) + articles[0]["ops"]
+        for article in articles:
+            article["page"] = page
+            article["link"] = pdf.add_link()
+            page += paginate(pdf, article["ops"])[0]
+
+    # Document properties
+    pdf.set_title(REPORT_TITLE)
+    pdf.set_subject(f"{total} articles")
+    pdf.set_keywords(", ".join(label for label, _ in ordered))
+    pdf.set_creator("json_to_pdf.py")
+
     # Cover page
     pdf.add_page()
-    pdf.set_font("DejaVu", 'B', 20)  # Cover page title larger if needed
-    pdf.cell(0, 20, "Exercise snacking Study", ln=True, align="C")
+    pdf.set_font(FONT_FAMILY, 'B', 20)  # Cover page title larger if needed
+    pdf.cell(0, 20, REPORT_TITLE, ln=True, align="C")
     pdf.ln(10)
-    
-    # Add a page for each entry in JSON
-    for entry in data:
-        title = entry.get("title", "No Title")
-        abstract = entry.get("abstract", "No abstract available.")
-        
-        pdf.add_page()
-        pdf.chapter_title(title)
-        pdf.chapter_body(abstract)
-    
+
+    pdf.add_page()
+    render_toc(pdf, toc)
+
+    for _, articles in ordered:
+        for article in articles:
+            pdf.add_page()
+            pdf.set_link(article["link"], y=pdf.get_y())
+            pdf.render(article["ops"])
+
     # Save the PDF to file
     pdf.output(output_file)
-    print(f"PDF saved as {output_file}")
+    print(f"PDF saved as {output_file} ({pdf.page} pages, {total - reused} articles laid out, {reused} reused)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the PDF report of the summarized articles.")
+    parser.add_argument("--input", default="abstracts_gpu.jsonl", help="abstracts from the summarizer")
+    parser.add_argument("--output", default="Exercise_snacking_Study.pdf")
+    parser.add_argument("--results", default="scholar_results_clean.jsonl",
+                        help="scholar results to take authors, year, citations and links from")
+    parser.add_argument("--embeddings", default="../embeddings",
+                        help="semantic index whose topics become report sections (skipped if absent)")
+    parser.add_argument("--font", default=FONT_PATH)
+    args = parser.parse_args(argv)
+    build_report(args.input, args.output, args.results, args.embeddings, args.font)
 
 if __name__ == "__main__":
     main()
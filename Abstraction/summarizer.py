@@ -0,0 +1,368 @@
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from result_store import iter_records, write_records
+from checkpoint import Checkpoint, content_hash, record_key
+from batch_summarizer import BatchSummarizer
+from chunking import chunk_text
+from summary_cache import SummaryCache
+from extractive import extractive_summary
+from search_index import SearchIndex
+from metrics import metrics
+from blob_store import load_text
+from summary_profiles import PROFILE_FILES
+
+MODEL_NAME = "facebook/bart-large-cnn"
+
+# The onnx backend exports the model here on first use and loads it from here afterwards
+ONNX_MODEL_DIR = os.path.join("onnx_models", MODEL_NAME.replace("/", "--"))
+
+# Chunks summarized together in one padded batch, and articles whose chunks are pooled per engine call
+BATCH_SIZE = 8
+ARTICLES_PER_BATCH = 16
+
+# Sentences repeated at the start of the next chunk so no chunk starts mid-thought
+CHUNK_OVERLAP_SENTENCES = 1
+
+def simple_summary(text, num_sentences=2):
+    """
+    Fallback summary: the most central sentences of the text (see extractive.py).
+    Needs no model and no downloads, so it is also the "extractive" backend.
+    """
+    with metrics.timer("summarize.extractive"):
+        return extractive_summary(text, num_sentences=num_sentences)
+
+# Generation lengths for a chunk / for the combined chunk summaries, set dynamically by token count
+def dynamic_chunk_lengths(token_count):
+    effective_max_length = 600 if token_count > 600 else token_count - 1
+    effective_min_length = 200 if effective_max_length > 200 else max(100, effective_max_length - 1)
+    return effective_max_length, effective_min_length
+
+def dynamic_combine_lengths(token_count):
+    final_max_length = 600 if token_count > 600 else token_count - 1
+    final_min_length = 250 if final_max_length > 250 else max(100, final_max_length - 1)
+    return final_max_length, final_min_length
+
+# Increased lengths for a full-page summary
+def long_chunk_lengths(token_count):
+    return 800, 400
+
+def long_combine_lengths(token_count):
+    return 1000, 500
+
+# Summarization profiles: what used to be abstract.py ("cpu") and abstract_gpu.py ("gpu")
+PROFILES = {
+    "cpu": {
+        "device": "cpu",
+        **PROFILE_FILES["cpu"],
+        "chunk_lengths": dynamic_chunk_lengths,
+        "combine_lengths": dynamic_combine_lengths,
+        "max_chunks": None,
+        "always_combine": False,
+        "chunk_fallback_sentences": 1,
+        "combine_fallback_sentences": 2,
+        "extractive_sentences": 5,
+    },
+    "gpu": {
+        "device": "cuda:0",
+        **PROFILE_FILES["gpu"],
+        "chunk_lengths": long_chunk_lengths,
+        "combine_lengths": long_combine_lengths,
+        "max_chunks": 5,
+        "always_combine": True,
+        "chunk_fallback_sentences": 3,
+        "combine_fallback_sentences": 50,
+        "extractive_sentences": 15,
+    },
+}
+
+# torch: the PyTorch model as is; quantized: dynamic int8 Linear layers (CPU only);
+# onnx: ONNX Runtime through optimum; extractive: no model, sentence extraction only
+BACKENDS = ("torch", "quantized", "onnx", "extractive")
+
+def export_onnx_model(model_dir=ONNX_MODEL_DIR):
+    """
+    Exports MODEL_NAME to ONNX in `model_dir` unless an earlier run already
+    did, and returns the directory. The export is written next to it and
+    renamed into place, so an interrupted export is never loaded.
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        raise RuntimeError("The onnx backend needs 'optimum[onnxruntime]' installed")
+    if not os.path.isdir(model_dir):
+        print(f"Exporting {MODEL_NAME} to ONNX in {model_dir} (first run only)")
+        tmp_dir = f"{model_dir}.tmp{os.getpid()}"
+        ORTModelForSeq2SeqLM.from_pretrained(MODEL_NAME, export=True).save_pretrained(tmp_dir)
+        try:
+            os.replace(tmp_dir, model_dir)
+        except OSError:
+            # Another process finished its export first; keep that one
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return model_dir
+
+def load_model(backend, device, threads=None):
+    """Loads the tokenizer and model for a backend. Nothing heavy is imported before this runs."""
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+    if threads:
+        torch.set_num_threads(threads)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+
+    if backend == "onnx":
+        model_dir = export_onnx_model()
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        return tokenizer, ORTModelForSeq2SeqLM.from_pretrained(model_dir)
+
+    model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME).eval()
+    if backend == "quantized":
+        if device != "cpu":
+            print(f"⚠️ Quantized backend runs on CPU only; ignoring device {device}")
+        return tokenizer, torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tokenizer, model.to(device)
+
+class Summarizer:
+    """
+    Article summarizer for one profile and backend. The model is loaded on
+    first use, so creating a Summarizer (or importing this module) is cheap.
+    """
+
+    def __init__(self, profile="cpu", backend="torch", threads=None, batch_size=BATCH_SIZE, use_cache=True):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        self.profile_name = profile
+        self.profile = PROFILES[profile]
+        self.backend = backend
+        self.threads = threads
+        self.batch_size = batch_size
+        self.cache = SummaryCache() if use_cache and backend != "extractive" else None
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            tokenizer, model = load_model(self.backend, self.profile["device"], self.threads)
+            self._engine = BatchSummarizer(
+                model, tokenizer,
+                chunk_text=lambda text: chunk_text(text, tokenizer, max_tokens=1024,
+                                                   overlap_sentences=CHUNK_OVERLAP_SENTENCES),
+                fallback=simple_summary,
+                chunk_lengths=self.profile["chunk_lengths"],
+                combine_lengths=self.profile["combine_lengths"],
+                batch_size=self.batch_size,
+                max_chunks=self.profile["max_chunks"],
+                always_combine=self.profile["always_combine"],
+                chunk_fallback_sentences=self.profile["chunk_fallback_sentences"],
+                combine_fallback_sentences=self.profile["combine_fallback_sentences"],
+                cache=self.cache,
+                # Quantized and ONNX models don't produce identical summaries; keep their cache entries apart
+                model_id=MODEL_NAME if self.backend == "torch" else f"{MODEL_NAME}+{self.backend}",
+            )
+        return self._engine
+
+    def summarize_many(self, articles):
+        """Summarize `articles` ({key: text}) and return {key: summary}."""
+        if self.backend == "extractive":
+            return {key: simple_summary(text, num_sentences=self.profile["extractive_sentences"])
+                    for key, text in articles.items()}
+        return self.engine.summarize_many(articles)
+
+    def generate_abstract(self, text, article_title=""):
+        """
+        Generates an abstract from the input text.
+        Splits text into chunks, summarizes each, and combines them.
+        """
+        return self.summarize_many({article_title: text})[article_title]
+
+# Summarizer owned by a worker process of the process pool
+_worker_summarizer = None
+
+def _init_worker(profile, backend, threads, batch_size, use_cache):
+    """
+    Process pool initializer. Forked workers inherit the parent's already
+    loaded CPU model (its weights stay shared copy-on-write); spawned workers
+    load their own, on their own CUDA context for a GPU profile. Either way each worker gets its own SQLite connection and a
+    bounded number of torch threads.
+    """
+    global _worker_summarizer
+    # A forked worker starts with a copy of the parent's metrics; only report its own
+    metrics.snapshot(reset=True)
+    if _worker_summarizer is None:
+        _worker_summarizer = Summarizer(profile, backend, threads=threads,
+                                        batch_size=batch_size, use_cache=use_cache)
+        return
+    if threads and backend != "extractive":
+        import torch
+        torch.set_num_threads(threads)
+    if _worker_summarizer.cache is not None:
+        _worker_summarizer.cache = SummaryCache()
+        if _worker_summarizer._engine is not None:
+            _worker_summarizer._engine.cache = _worker_summarizer.cache
+
+def _summarize_in_worker(articles):
+    """Summaries plus the worker's metrics since its last batch, merged by the parent."""
+    return _worker_summarizer.summarize_many(articles), metrics.snapshot(reset=True)
+
+def summarize_records(records, summarizer, checkpoint, executor=None, max_in_flight=2):
+    """
+    Yields an abstract per record, in input order, reusing the ones checkpointed for unchanged texts.
+    Records still to be summarized are pooled ARTICLES_PER_BATCH at a time so their chunks share batches.
+    With a process pool `executor`, up to `max_in_flight` batches are summarized concurrently
+    while results are still written back in input order.
+    """
+    segments = deque()   # (records in input order, batch, abstracts or future)
+    pending = []         # (title, abstract or None) in input order
+    batch = []           # (title, key, text_hash, full_text) still to summarize
+
+    def submit():
+        articles = {title: full_text for title, _, _, full_text in batch}
+        if not articles:
+            result = {}
+        elif executor is None:
+            result = summarizer.summarize_many(articles)
+        else:
+            result = executor.submit(_summarize_in_worker, articles)
+        segments.append((list(pending), list(batch), result))
+        pending.clear()
+        batch.clear()
+
+    def drain(limit):
+        while len(segments) > limit:
+            segment_records, segment_batch, result = segments.popleft()
+            try:
+                if isinstance(result, Future):
+                    abstracts, worker_metrics = result.result()
+                    metrics.merge(worker_metrics)
+                else:
+                    abstracts = result
+            except Exception as e:
+                print(f"Error summarizing batch: {e}")
+                abstracts = {title: "Error generating abstract." for title, _, _, _ in segment_batch}
+            else:
+                for title, key, text_hash, _ in segment_batch:
+                    checkpoint.record(key, text_hash, abstracts[title])
+            for title, abstract in segment_records:
+                if abstract is None:
+                    abstract = abstracts[title]
+                print(f"Processed: {title}")
+                yield {
+                    "title": title,
+                    "abstract": abstract
+                }
+
+    def flush():
+        submit()
+        yield from drain(max_in_flight if executor is not None else 0)
+
+    for entry in records:
+        title = entry.get("title", "No Title")
+        full_text = load_text(entry.get("full_abstract", {}).get("Full Text Content", ""))
+        key, text_hash = record_key(entry), content_hash(full_text)
+
+        # A title can only appear once per batch
+        if any(title == queued for queued, _, _, _ in batch):
+            yield from flush()
+
+        abstract = checkpoint.get(key, text_hash)
+        if abstract is not None:
+            print(f"Already summarized: {title}")
+        elif full_text:
+            batch.append((title, key, text_hash, full_text))
+        else:
+            abstract = "No content available for summarization."
+        pending.append((title, abstract))
+
+        if len(batch) >= ARTICLES_PER_BATCH:
+            yield from flush()
+
+    submit()
+    yield from drain(0)
+
+def _can_fork(summarizer):
+    """
+    Whether workers may be forked from this process: only with the model on
+    the CPU (a child can't use the parent's CUDA context) and with no other
+    thread running that could hold a lock the child would inherit.
+    """
+    on_cpu = summarizer.backend != "torch" or summarizer.profile["device"] == "cpu"
+    return on_cpu and threading.active_count() == 1 and "fork" in mp.get_all_start_methods()
+
+def make_worker_pool(summarizer, workers, threads=None):
+    """
+    Process pool of `workers` summarizers, each with its own model instance.
+    Threads per worker default to an even share of the cores so workers don't oversubscribe them.
+    Workers are forked from an already loaded CPU model when that is safe, else spawned.
+    """
+    global _worker_summarizer
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    if _can_fork(summarizer):
+        # Load once here; forked workers share the weights copy-on-write
+        if summarizer.backend != "extractive":
+            summarizer.engine
+        _worker_summarizer = summarizer
+        context = mp.get_context("fork")
+    else:
+        if summarizer.backend == "onnx":
+            # Export once here rather than in every spawned worker
+            export_onnx_model()
+        context = mp.get_context("spawn")
+    print(f"Summarizing with {workers} worker processes x {threads} threads")
+    return ProcessPoolExecutor(
+        workers, mp_context=context, initializer=_init_worker,
+        initargs=(summarizer.profile_name, summarizer.backend, threads,
+                  summarizer.batch_size, summarizer.cache is not None),
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize scraped articles into abstracts.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="cpu")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (default: torch's choice)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--input", help="results file to summarize (default: the profile's)")
+    parser.add_argument("--output", help="abstracts file to write (default: the profile's)")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the summary cache")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes, each with its own model (default: 1, in-process)")
+    parser.add_argument("--search-index", help="search index to add the abstracts to as they are written")
+    args = parser.parse_args(argv)
+
+    profile = PROFILES[args.profile]
+    input_file = args.input or profile["input_file"]
+    output_file = args.output or profile["output_file"]
+    summarizer = Summarizer(args.profile, args.backend, threads=args.threads,
+                            batch_size=args.batch_size, use_cache=not args.no_cache)
+    checkpoint = Checkpoint(f"summarize_{args.profile}_{args.backend}")
+    search_index = SearchIndex(args.search_index) if args.search_index else None
+
+    def indexed(abstracts):
+        for entry in abstracts:
+            search_index.add_summary(entry["title"], entry["abstract"])
+            yield entry
+
+    # Stream the scholar results and save the abstracts as JSON Lines
+    if args.workers > 1:
+        with make_worker_pool(summarizer, args.workers, args.threads) as pool:
+            abstracts = summarize_records(iter_records(input_file), summarizer, checkpoint,
+                                          executor=pool, max_in_flight=2 * args.workers)
+            write_records(output_file, indexed(abstracts) if search_index is not None else abstracts)
+    else:
+        abstracts = summarize_records(iter_records(input_file), summarizer, checkpoint)
+        write_records(output_file, indexed(abstracts) if search_index is not None else abstracts)
+
+    print(f"\nAbstracts saved in {output_file}")
+    if summarizer.cache is not None:
+        print(f"Summary cache: {summarizer.cache.hits} hits, {summarizer.cache.misses} misses")
+    print(metrics.summary_table())
+    metrics.export()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+SUMMARY_CACHE_PATH = "summary_cache.sqlite"
+
+
+def summary_key(model_id, token_ids, max_length, min_length):
+    """
+    Cache key of one generation: the model, the exact input tokens and the
+    generation lengths. Chunk boundaries (chunk size, overlap) are part of the
+    input tokens, so changing the chunk config changes the key.
+    """
+    payload = json.dumps([model_id, max_length, min_length])
+    digest = hashlib.sha256(payload.encode("utf-8"))
+    digest.update(",".join(map(str, token_ids)).encode("ascii"))
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    Persistent, size-bounded LRU cache of model summaries, stored in SQLite.
+
+    Used for chunk summaries and for the combine pass alike, so changing only
+    the final combine lengths re-runs the combine pass but still reuses every
+    cached chunk summary. Shared by abstract.py and abstract_gpu.py.
+    """
+
+    # Cache hits whose last-use times are written together
+    TOUCH_BATCH = 100
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, max_bytes=512 * 1024 ** 2):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> last use not yet written, see _touch
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY, summary TEXT NOT NULL,"
+            " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries(last_used)")
+        # Total size of the summaries, kept current by triggers so put() needn't sum the table
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._db.execute("INSERT OR IGNORE INTO meta SELECT 'total_size', COALESCE(SUM(size), 0) FROM summaries")
+        self._db.execute(
+            "CREATE TRIGGER IF NOT EXISTS summaries_insert AFTER INSERT ON summaries BEGIN"
+            " UPDATE meta SET value = value + new.size WHERE name = 'total_size'; END"
+        )
+        self._db.execute(
+            "CREATE TRIGGER IF NOT EXISTS summaries_update AFTER UPDATE OF size ON summaries BEGIN"
+            " UPDATE meta SET value = value + new.size - old.size WHERE name = 'total_size'; END"
+        )
+        self._db.execute(
+            "CREATE TRIGGER IF NOT EXISTS summaries_delete AFTER DELETE ON summaries BEGIN"
+            " UPDATE meta SET value = value - old.size WHERE name = 'total_size'; END"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touch(key)
+            self.hits += 1
+            return row[0]
+
+    def _touch(self, key):
+        # Called with the lock held. Reads stay reads: last-use times are
+        # written in batches, with the next put or every TOUCH_BATCH hits
+        self._touched[key] = time.time()
+        if len(self._touched) >= self.TOUCH_BATCH:
+            self._write_touches()
+            self._db.commit()
+
+    def _write_touches(self):
+        if self._touched:
+            self._db.executemany("UPDATE summaries SET last_used = ? WHERE key = ?",
+                                 [(used, key) for key, used in self._touched.items()])
+            self._touched.clear()
+
+    def put(self, key, summary):
+        size = len(summary.encode("utf-8"))
+        with self._lock:
+            self._write_touches()
+            self._db.execute(
+                "INSERT INTO summaries (key, summary, size, last_used) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET summary = excluded.summary,"
+                " size = excluded.size, last_used = excluded.last_used",
+                (key, summary, size, time.time()),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # Drop least recently used summaries until the cache fits in max_bytes
+        total = self._db.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._db.execute("SELECT key, size FROM summaries ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM summaries WHERE key = ?", stale)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._write_touches()
+            self._db.commit()
+        self._db.close()
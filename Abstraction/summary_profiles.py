@@ -0,0 +1,12 @@
+# Files read and written by each summarization profile (see summarizer.PROFILES).
+# Kept apart from summarizer.py so the pipeline can name them without loading it.
+PROFILE_FILES = {
+    "cpu": {
+        "input_file": "scholar_results.jsonl",
+        "output_file": "abstracts.jsonl",
+    },
+    "gpu": {
+        "input_file": "scholar_results_clean.jsonl",
+        "output_file": "abstracts_gpu.jsonl",
+    },
+}
@@ -0,0 +1,468 @@
+import argparse
+import contextlib
+import copy
+import glob
+import html
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+ABSTRACTION_DIR = os.path.join(ROOT_DIR, "Abstraction")
+sys.path.insert(0, ABSTRACTION_DIR)
+from result_store import iter_records, write_records
+from blob_store import BlobStore, inline_record
+from clean import SEGMENTER
+
+# Fixture sources: the scraped results and, when present, the HTML cache the scraper fills
+RESULTS_FILES = ("scholar_results.jsonl", "scholar_results.json")
+HTML_CACHE_DIR = "html_cache"
+FONT_PATH = os.path.join(ABSTRACTION_DIR, "DejaVuSans.ttf")
+
+# Each run is saved here as <timestamp>.json; the latest earlier run is the default baseline
+BENCHMARK_DIR = "benchmark_results"
+
+SCALES = (1, 10, 100)
+REPEATS = 3
+
+# A case is a regression when its median time grows by more than REGRESSION_THRESHOLD
+# and by more than NOISE_FLOOR seconds, so timer jitter on tiny cases isn't flagged
+REGRESSION_THRESHOLD = 0.10
+NOISE_FLOOR = 0.005
+# Run settings that change what is measured; a baseline must match on all of them
+COMPARED_SETTINGS = ("results", "model", "profile", "segmenter")
+
+# Articles per summarize_many call, as in the summarizer
+ARTICLES_PER_BATCH = 16
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+class Fixture:
+    """
+    The benchmark corpus: the saved scholar records and one HTML page per
+    record (the cached page if the HTML cache has it, else a page rebuilt
+    from the record's fields). scaled(n) repeats them n times with distinct
+    titles and links, so per-record caches and dedup see n times the data.
+    """
+
+    def __init__(self, results_file, html_cache_dir=HTML_CACHE_DIR):
+        # Texts are put back inline so every case gets the same input, whatever store it uses
+        self.records = [inline_record(r) for r in iter_records(results_file)]
+        if not self.records:
+            raise ValueError(f"No records in {results_file}")
+        cached = self._cached_pages(html_cache_dir)
+        self.pages = [(r.get("link") or f"https://example.org/{i}",
+                       cached.get(r.get("link")) or synthetic_page(r))
+                      for i, r in enumerate(self.records)]
+        self.cached_pages = sum(r.get("link") in cached for r in self.records)
+
+    @staticmethod
+    def _cached_pages(html_cache_dir):
+        if not os.path.isdir(html_cache_dir):
+            return {}
+        from html_cache import HtmlCache
+        cache = HtmlCache(html_cache_dir)
+        pages = {}
+        for url in list(cache.index):
+            page = cache.get(url)
+            if page is not None:
+                pages[url] = page
+        return pages
+
+    def scaled_records(self, scale):
+        for copy in range(scale):
+            for record in self.records:
+                if copy:
+                    record = dict(record, title=f"{record.get('title', '')} ({copy})",
+                                  link=f"{record.get('link', '')}#{copy}")
+                yield record
+
+    def scaled_pages(self, scale):
+        for copy in range(scale):
+            yield from self.pages
+
+
+def synthetic_page(record):
+    """A publisher-like page carrying the record's title, abstract, DOI, keywords and text."""
+    full = record.get("full_abstract") or {}
+    escape = lambda value: html.escape(str(value or ""))
+    return (
+        "<html><head><title>{title}</title><script>var tracking = 1;</script></head><body>"
+        "<nav><a href='/'>Home</a> <a href='/journals'>Journals</a></nav>"
+        "<h1>{title}</h1><div class='authors'>{authors}</div>"
+        "<div class='abstract-content'>{abstract}</div>"
+        "<a href='{doi}'>{doi}</a><section class='keywords'>Keywords: {keywords}</section>"
+        "<article><p>{text}</p></article><footer>© Publisher</footer></body></html>"
+    ).format(title=escape(record.get("title")), authors=escape(full.get("Authors")),
+             abstract=escape(full.get("Abstract") or record.get("abstract")),
+             doi=escape(full.get("DOI") if str(full.get("DOI", "")).startswith("http") else "https://doi.org/10.0/0"),
+             keywords=escape(full.get("Keywords")), text=escape(full.get("Full Text Content")))
+
+
+def full_texts(records):
+    return {r.get("title", ""): r["full_abstract"]["Full Text Content"] for r in records
+            if (r.get("full_abstract") or {}).get("Full Text Content")}
+
+
+class StubTokenizer:
+    """
+    Word-level stand-in for the BART tokenizer: the calls chunk_text and
+    BatchSummarizer make, with no downloads and no torch.
+    """
+
+    model_max_length = 1024
+    pad_token_id = 0
+
+    def __init__(self):
+        self.vocab = {"<pad>": 0}
+        self.words = ["<pad>"]
+
+    def _id(self, word):
+        if word not in self.vocab:
+            self.vocab[word] = len(self.words)
+            self.words.append(word)
+        return self.vocab[word]
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        matches = list(TOKEN_PATTERN.finditer(text))
+        encoding = {"input_ids": [self._id(m.group()) for m in matches]}
+        if return_offsets_mapping:
+            encoding["offset_mapping"] = [m.span() for m in matches]
+        return encoding
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def encode(self, text, add_special_tokens=False):
+        return self(text)["input_ids"]
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(self.words[i] for i in ids if i)
+
+
+def stub_engine(profile):
+    """BatchSummarizer whose "model" copies the head of its input: the summarizer's own overhead, no model time."""
+    from batch_summarizer import BatchSummarizer
+    from chunking import chunk_text
+    from summarizer import CHUNK_OVERLAP_SENTENCES, PROFILES, simple_summary
+
+    class StubSummarizer(BatchSummarizer):
+        def _generate(self, batch_ids, max_length, min_length):
+            return [self.tokenizer.decode(ids[:max(min_length, max_length // 4)]) for ids in batch_ids]
+
+    settings = PROFILES[profile]
+    tokenizer = StubTokenizer()
+    return StubSummarizer(
+        None, tokenizer,
+        chunk_text=lambda text: chunk_text(text, tokenizer, overlap_sentences=CHUNK_OVERLAP_SENTENCES),
+        fallback=simple_summary,
+        chunk_lengths=settings["chunk_lengths"], combine_lengths=settings["combine_lengths"],
+        max_chunks=settings["max_chunks"], always_combine=settings["always_combine"],
+        chunk_fallback_sentences=settings["chunk_fallback_sentences"],
+        combine_fallback_sentences=settings["combine_fallback_sentences"],
+        model_id="stub",
+    )
+
+
+def model_engine(model_name, profile):
+    """BatchSummarizer over a real (ideally tiny, e.g. sshleifer/bart-tiny-random) Hugging Face model."""
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+    from batch_summarizer import BatchSummarizer
+    from chunking import chunk_text
+    from summarizer import CHUNK_OVERLAP_SENTENCES, PROFILES, simple_summary
+
+    settings = PROFILES[profile]
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+    max_tokens = min(tokenizer.model_max_length, 1024)
+    return BatchSummarizer(
+        model, tokenizer,
+        chunk_text=lambda text: chunk_text(text, tokenizer, max_tokens=max_tokens,
+                                           overlap_sentences=CHUNK_OVERLAP_SENTENCES),
+        fallback=simple_summary,
+        chunk_lengths=settings["chunk_lengths"], combine_lengths=settings["combine_lengths"],
+        max_chunks=settings["max_chunks"], always_combine=settings["always_combine"],
+        chunk_fallback_sentences=settings["chunk_fallback_sentences"],
+        combine_fallback_sentences=settings["combine_fallback_sentences"],
+        model_id=model_name,
+    )
+
+
+# Cases: setup(fixture, scale, workdir, options) -> (run, items[, warmup]). Setup
+# is not timed; run() is, once per repeat, each time in a fresh working
+# directory so no checkpoint or cache from an earlier repeat is reused. A case
+# with a warmup runs it once first, then every repeat in its directory.
+
+def setup_parse(fixture, scale, workdir, options):
+    # What parse_full_content runs, without importing the scraper's browser stack
+    from extractors import extract_article
+    import lxml.html  # noqa: F401 -- extractors loads it lazily; a missing lxml should skip the case
+    pages = list(fixture.scaled_pages(scale))
+
+    def run():
+        for url, page in pages:
+            extract_article(page, url)
+    return run, len(pages)
+
+
+def setup_clean(fixture, scale, workdir, options):
+    from clean import clean_records, get_nlp
+    get_nlp(options.segmenter)  # model load isn't what we measure
+    # clean_records adds to each record's full_abstract; keep the fixture's own untouched
+    records = copy.deepcopy(list(fixture.scaled_records(scale)))
+    # Cleaned texts go to a throwaway store, not the project's blobs/
+    store = BlobStore(os.path.join(workdir, "blobs"))
+
+    def run():
+        for _ in clean_records(iter(records), segmenter=options.segmenter, store=store):
+            pass
+    return run, len(records)
+
+
+def setup_chunk(fixture, scale, workdir, options):
+    engine = options.engine()
+    texts = list(full_texts(fixture.scaled_records(scale)).values())
+
+    def run():
+        for text in texts:
+            engine.chunk_text(text)
+    return run, len(texts)
+
+
+def setup_summarize(fixture, scale, workdir, options):
+    engine = options.engine()
+    articles = list(full_texts(fixture.scaled_records(scale)).items())
+
+    def run():
+        for start in range(0, len(articles), ARTICLES_PER_BATCH):
+            engine.summarize_many(dict(articles[start:start + ARTICLES_PER_BATCH]))
+    return run, len(articles)
+
+
+def setup_export(fixture, scale, workdir, options):
+    from jsonTocsv import json_to_csv
+    records_file = os.path.join(workdir, "records.jsonl")
+    write_records(records_file, fixture.scaled_records(scale))
+
+    def run():
+        json_to_csv(records_file, "output.csv")
+    return run, len(fixture.records) * scale
+
+
+def _pdf_inputs(fixture, scale, workdir):
+    records_file = os.path.join(workdir, "records.jsonl")
+    abstracts_file = os.path.join(workdir, "abstracts.jsonl")
+    write_records(records_file, fixture.scaled_records(scale))
+    write_records(abstracts_file, ({"title": r.get("title", ""),
+                                    "abstract": (r.get("full_abstract") or {}).get("Full Text Content", "")[:3000]}
+                                   for r in fixture.scaled_records(scale)))
+    return records_file, abstracts_file
+
+
+def setup_pdf(fixture, scale, workdir, options):
+    from json_to_pdf import build_report, new_pdf
+    new_pdf()  # imports fpdf, so a missing fpdf skips the case instead of failing run()
+    records_file, abstracts_file = _pdf_inputs(fixture, scale, workdir)
+
+    def run():
+        build_report(abstracts_file, "report.pdf", records_file, None, FONT_PATH)
+    return run, len(fixture.records) * scale
+
+
+def setup_pdf_rebuild(fixture, scale, workdir, options):
+    """A rebuild with every article's layout already cached, as after a small change."""
+    run, items = setup_pdf(fixture, scale, workdir, options)
+    # The untimed first build fills the layout cache the timed ones reuse
+    return run, items, run
+
+
+CASES = {
+    "parse": setup_parse,
+    "clean": setup_clean,
+    "chunk": setup_chunk,
+    "summarize": setup_summarize,
+    "export": setup_export,
+    "pdf": setup_pdf,
+    "pdf_rebuild": setup_pdf_rebuild,
+}
+
+
+@contextlib.contextmanager
+def quiet(path):
+    """Run the block in directory `path` (created if needed) with its progress output discarded."""
+    os.makedirs(path, exist_ok=True)
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        os.chdir(previous)
+
+
+def time_case(setup, fixture, scale, options):
+    """Times one case at one scale. Returns its result entry, or {"skipped": reason} when a dependency is missing."""
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        try:
+            with quiet(workdir):
+                prepared = setup(fixture, scale, workdir, options)
+        except ImportError as e:
+            return {"skipped": f"missing dependency: {e.name or e}"}
+        run, items, warmup = (*prepared, None)[:3]
+        if warmup is not None:
+            with quiet(os.path.join(workdir, "warm")):
+                warmup()
+
+        timings = []
+        for repeat in range(options.repeats):
+            with quiet(os.path.join(workdir, "warm" if warmup else f"run{repeat}")):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    return {"items": items, "times": [round(t, 6) for t in timings], "median": round(median, 6),
+            "min": round(min(timings), 6), "items_per_s": round(items / median, 1) if median else None}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latest_run(directory=BENCHMARK_DIR, exclude=None):
+    runs = sorted(path for path in glob.glob(os.path.join(directory, "*.json")) if path != exclude)
+    return runs[-1] if runs else None
+
+
+def settings_mismatch(current, baseline):
+    """The COMPARED_SETTINGS on which two runs differ, as {name: (baseline, current)}."""
+    before, after = baseline.get("settings", {}), current["settings"]
+    return {name: (before.get(name), after.get(name))
+            for name in COMPARED_SETTINGS if before.get(name) != after.get(name)}
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """[(case, scale, baseline median, current median, change)] and the regressions among them."""
+    rows, regressions = [], []
+    for case, scales in current["results"].items():
+        for scale, entry in scales.items():
+            before = baseline["results"].get(case, {}).get(scale, {})
+            if "median" not in entry or "median" not in before:
+                continue
+            change = entry["median"] / before["median"] - 1 if before["median"] else 0.0
+            row = (case, scale, before["median"], entry["median"], change)
+            rows.append(row)
+            if change > threshold and entry["median"] - before["median"] > NOISE_FLOOR:
+                regressions.append(row)
+    return rows, regressions
+
+
+def print_results(run, rows=()):
+    changes = {(case, scale): change for case, scale, _, _, change in rows}
+    print(f"{'case':<12} {'scale':>6} {'items':>8} {'median s':>10} {'items/s':>10} {'vs baseline':>12}")
+    for case, scales in run["results"].items():
+        for scale, entry in scales.items():
+            if "skipped" in entry:
+                print(f"{case:<12} {scale:>6} skipped ({entry['skipped']})")
+                continue
+            change = changes.get((case, scale))
+            change = f"{change:+.1%}" if change is not None else ""
+            print(f"{case:<12} {scale:>6} {entry['items']:>8} {entry['median']:>10.4f} "
+                  f"{entry['items_per_s'] or 0:>10.1f} {change:>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time parsing, cleaning, summarization, export and the PDF build offline.")
+    parser.add_argument("cases", nargs="*", default=list(CASES), help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES), help="corpus sizes, as multiples of the fixture")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--results", help="scholar results to build the fixture from (default: the scraped results)")
+    parser.add_argument("--html-cache", default=HTML_CACHE_DIR, help="cached pages to parse, where available")
+    parser.add_argument("--model", default="stub",
+                        help="summarizer model for chunk/summarize: 'stub' (no model) or a Hugging Face model name")
+    parser.add_argument("--profile", default="cpu", help="summarization profile (see Abstraction/summarizer.py)")
+    parser.add_argument("--segmenter", default=SEGMENTER, help=f"spaCy segmenter for the clean case (default: {SEGMENTER}, as in production)")
+    parser.add_argument("--output-dir", default=BENCHMARK_DIR)
+    parser.add_argument("--baseline", help="earlier run to compare with (default: the latest in --output-dir)")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="slowdown flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown case(s) {sorted(unknown)}; expected {list(CASES)}")
+    results_file = args.results or next((path for path in RESULTS_FILES if os.path.exists(path)), None)
+    if results_file is None:
+        parser.error(f"no results file found ({', '.join(RESULTS_FILES)}); pass --results")
+    fixture = Fixture(os.path.abspath(results_file), args.html_cache)
+    print(f"Fixture: {len(fixture.records)} records from {results_file}, "
+          f"{fixture.cached_pages} cached pages, {len(fixture.records) - fixture.cached_pages} synthetic")
+
+    # One summarizer engine for every scale, built on first use
+    engines = []
+
+    def engine():
+        if not engines:
+            engines.append(stub_engine(args.profile) if args.model == "stub" else model_engine(args.model, args.profile))
+        return engines[0]
+    args.engine = engine
+
+    run = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {"results": results_file, "model": args.model, "profile": args.profile,
+                     "segmenter": args.segmenter, "repeats": args.repeats},
+        "results": {},
+    }
+    for case in args.cases:
+        run["results"][case] = {}
+        for scale in args.scales:
+            print(f"Timing {case} at {scale}x...")
+            entry = time_case(CASES[case], fixture, scale, args)
+            run["results"][case][str(scale)] = entry
+            if "skipped" in entry:
+                print(f"⚠️ {case} skipped: {entry['skipped']}")
+                break
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output = os.path.join(args.output_dir, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    baseline_file = args.baseline or latest_run(args.output_dir, exclude=output)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+
+    rows, regressions = [], []
+    if baseline_file:
+        with open(baseline_file, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        mismatch = settings_mismatch(run, baseline)
+        if mismatch:
+            differences = ", ".join(f"{name} {before!r} -> {after!r}" for name, (before, after) in mismatch.items())
+            print(f"⚠️ Not comparing with {baseline_file}: settings differ ({differences})")
+            baseline_file = None
+        else:
+            rows, regressions = compare(run, baseline, args.threshold)
+    print()
+    print_results(run, rows)
+    print(f"\n✅ Results saved in {output}" + (f" (compared with {baseline_file})" if baseline_file else ""))
+    for case, scale, before, after, change in regressions:
+        print(f"⚠️ Regression: {case} at {scale}x took {after:.4f}s, {change:+.1%} vs {before:.4f}s")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from result_store import iter_records, write_records
+
+try:
+    import fcntl
+except ImportError:  # Windows: one writing process at a time
+    fcntl = None
+
+# Next to this module, so scripts run from Abstraction/ find the same blobs
+BLOB_DIR = os.environ.get("SCHOLAR_BLOB_DIR",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "blobs"))
+
+# Long texts of full_abstract moved out of the records; shorter values
+# (placeholders like "No Full Text Available") stay inline
+BLOB_FIELDS = ("Full Text Content", "Cleaned Text Content")
+INLINE_LIMIT = 256
+
+REF_PREFIX = "blob:"
+COMPRESSION_LEVEL = 6
+
+# Index entry: SHA-256 digest, offset and compressed length in the pack, text length in bytes
+INDEX_ENTRY = struct.Struct("<32sQII")
+
+
+def is_ref(value):
+    return isinstance(value, str) and value.startswith(REF_PREFIX) and len(value) == len(REF_PREFIX) + 64
+
+
+class BlobStore:
+    """
+    Content-addressed store of compressed texts.
+
+    Each distinct text is zlib-compressed once and appended to `pack`; `index`
+    maps its SHA-256 to the offset and length in the pack (fixed-size binary
+    entries, loaded into a dict on open). The pack is memory-mapped for
+    reads, so get() only decompresses the requested text. Both files are
+    append-only, and the pack is fsync'd before the index entry pointing into
+    it is written: a crash between the two writes leaves unreferenced bytes
+    in the pack, never a bad index entry. A partial entry left by a crash
+    mid-write is cut off before the index is read or appended to, so later
+    entries stay aligned.
+    """
+
+    def __init__(self, directory=BLOB_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.pack_path = os.path.join(directory, "pack")
+        self.index_path = os.path.join(directory, "index")
+        self._lock = threading.Lock()
+        self.entries = {}
+        self._index_size = 0
+        self._map = None
+        self._map_size = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "ab") as index:
+                self._locked(index, self._truncate_partial_entry)
+        self._refresh()
+
+    @staticmethod
+    def _locked(index, action):
+        if fcntl is not None:
+            fcntl.flock(index, fcntl.LOCK_EX)
+        try:
+            return action(index)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(index, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _truncate_partial_entry(index):
+        # Called with the index file locked
+        size = os.fstat(index.fileno()).st_size
+        if size % INDEX_ENTRY.size:
+            index.truncate(size - size % INDEX_ENTRY.size)
+
+    def _refresh(self):
+        # Called with the lock held (or from __init__): read index entries appended since the last look
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_size)
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        for digest, offset, length, size in INDEX_ENTRY.iter_unpack(data[:usable]):
+            self.entries[digest] = (offset, length, size)
+        self._index_size += usable
+
+    def put(self, text):
+        """Store `text` (once per distinct content) and return its reference."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).digest()
+        with self._lock:
+            if digest not in self.entries:
+                compressed = zlib.compress(data, COMPRESSION_LEVEL)
+                with open(self.pack_path, "ab") as pack, open(self.index_path, "ab") as index:
+                    self._locked(index, lambda index: self._append(pack, index, digest, compressed, len(data)))
+        return REF_PREFIX + digest.hex()
+
+    def _append(self, pack, index, digest, compressed, size):
+        # Called with the lock held and the index file locked
+        self._truncate_partial_entry(index)
+        # Another process may have stored it, or grown the pack, meanwhile
+        self._refresh()
+        if digest in self.entries:
+            return
+        pack.seek(0, os.SEEK_END)
+        offset = pack.tell()
+        pack.write(compressed)
+        pack.flush()
+        os.fsync(pack.fileno())
+        index.write(INDEX_ENTRY.pack(digest, offset, len(compressed), size))
+        index.flush()
+        os.fsync(index.fileno())
+        self.entries[digest] = (offset, len(compressed), size)
+        self._index_size += INDEX_ENTRY.size
+
+    def get(self, ref):
+        """The text behind a reference."""
+        digest = bytes.fromhex(ref[len(REF_PREFIX):])
+        with self._lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                self._refresh()
+                entry = self.entries.get(digest)
+            if entry is None:
+                raise KeyError(f"{ref} is not in the blob store at {self.directory}")
+            offset, length, _ = entry
+            if offset + length > self._map_size:
+                self._remap()
+            compressed = self._map[offset:offset + length]
+        return zlib.decompress(compressed).decode("utf-8")
+
+    def _remap(self):
+        # Called with the lock held: map the pack again now that it grew
+        if self._map is not None:
+            self._map.close()
+        with open(self.pack_path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._map_size = len(self._map)
+
+    def __contains__(self, ref):
+        return is_ref(ref) and bytes.fromhex(ref[len(REF_PREFIX):]) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        """(texts, bytes of text, bytes in the pack)."""
+        with self._lock:
+            return (len(self.entries), sum(size for _, _, size in self.entries.values()),
+                    os.path.getsize(self.pack_path) if os.path.exists(self.pack_path) else 0)
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+                self._map_size = 0
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """The process-wide store at BLOB_DIR, opened on first use."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = BlobStore(BLOB_DIR)
+        return _default_store
+
+
+def load_text(value, store=None):
+    """`value` itself, or the text it refers to when it is a blob reference."""
+    if is_ref(value):
+        return (store if store is not None else default_store()).get(value)
+    return value
+
+
+def store_text(value, store=None, inline_limit=INLINE_LIMIT):
+    """A reference for long texts, `value` unchanged otherwise."""
+    if isinstance(value, str) and len(value) > inline_limit and not is_ref(value):
+        return (store if store is not None else default_store()).put(value)
+    return value
+
+
+def externalize_record(record, store=None, fields=BLOB_FIELDS):
+    """Copy of `record` with its long full_abstract texts replaced by references."""
+    full = record.get("full_abstract")
+    if not isinstance(full, dict) or not any(field in full for field in fields):
+        return record
+    full = dict(full)
+    for field in fields:
+        if field in full:
+            full[field] = store_text(full[field], store)
+    return dict(record, full_abstract=full)
+
+
+def inline_record(record, store=None, fields=BLOB_FIELDS):
+    """Copy of `record` with every blob reference replaced by its text."""
+    full = record.get("full_abstract")
+    if not isinstance(full, dict) or not any(is_ref(full.get(field)) for field in fields):
+        return record
+    full = dict(full)
+    for field in fields:
+        if field in full:
+            full[field] = load_text(full[field], store)
+    return dict(record, full_abstract=full)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move article texts between results files and the blob store.")
+    parser.add_argument("--store", default=BLOB_DIR, help="blob store directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    externalize = commands.add_parser("externalize", help="replace long texts in results files by references")
+    externalize.add_argument("files", nargs="+")
+    inline = commands.add_parser("inline", help="write a copy of a results file with the texts put back")
+    inline.add_argument("src")
+    inline.add_argument("dst")
+    commands.add_parser("stats", help="size of the store")
+    args = parser.parse_args(argv)
+
+    store = BlobStore(args.store)
+    if args.command == "externalize":
+        for path in args.files:
+            before = os.path.getsize(path)
+            write_records(path, (externalize_record(record, store) for record in iter_records(path)))
+            print(f"✅ {path}: {before / 1e6:.1f} MB -> {os.path.getsize(path) / 1e6:.1f} MB")
+    elif args.command == "inline":
+        write_records(args.dst, (inline_record(record, store) for record in iter_records(args.src)))
+        print(f"✅ {args.src} written with its texts to {args.dst}")
+    texts, text_bytes, pack_bytes = store.stats()
+    print(f"{texts} texts, {text_bytes / 1e6:.1f} MB of text in {pack_bytes / 1e6:.1f} MB at {args.store}")
+
+
+if __name__ == "__main__":
+    main()
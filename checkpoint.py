@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from result_store import append_record, iter_records, write_records
+
+CHECKPOINT_DIR = ".checkpoints"
+
+
+def content_hash(value):
+    """Stable SHA-256 of any JSON-serializable value."""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def record_key(entry):
+    """Identity of a scholar record across stages (its normalized title)."""
+    return entry.get("title", "").strip().lower()
+
+
+class Checkpoint:
+    """
+    Per-record progress of one pipeline stage.
+
+    Every finished record is appended to `<directory>/<stage>.jsonl` as
+    (key, input hash, output). On restart, `get()` hands back the stored
+    output for records whose input is unchanged, so the stage only processes
+    new or modified records.
+    """
+
+    def __init__(self, stage, directory=CHECKPOINT_DIR):
+        self.stage = stage
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{stage}.jsonl")
+        self._lock = threading.Lock()
+        self.entries = {}
+        lines = 0
+        for entry in iter_records(self.path):
+            self.entries[entry["key"]] = entry
+            lines += 1
+        # Superseded entries pile up as inputs change; drop them now and then
+        if lines > 2 * len(self.entries) + 100:
+            self.compact()
+
+    def get(self, key, input_hash):
+        """Stored output for `key` if it was produced from `input_hash`, else None."""
+        entry = self.entries.get(key)
+        if entry is None or entry["input_hash"] != input_hash:
+            return None
+        return entry["output"]
+
+    def is_done(self, key, input_hash):
+        entry = self.entries.get(key)
+        return entry is not None and entry["input_hash"] == input_hash
+
+    def record(self, key, input_hash, output=None):
+        """Mark `key` as done for `input_hash`, persisting `output` immediately."""
+        entry = {
+            "stage": self.stage,
+            "key": key,
+            "input_hash": input_hash,
+            "output": output,
+            "finished_at": time.time(),
+        }
+        with self._lock:
+            append_record(self.path, entry)
+            self.entries[key] = entry
+
+    def compact(self):
+        with self._lock:
+            write_records(self.path, self.entries.values())
+
+    def __len__(self):
+        return len(self.entries)
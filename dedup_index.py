@@ -0,0 +1,222 @@
+import hashlib
+import random
+import re
+import threading
+import unicodedata
+from urllib.parse import unquote
+
+from html_cache import normalize_url
+from result_store import append_record, iter_records
+
+DEDUP_INDEX_FILE = "dedup_index.jsonl"
+
+# MinHash-LSH parameters: 16 bands of 4 rows make pairs with a Jaccard
+# similarity around 0.5 and above likely to share a bucket
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20250217)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+# Candidates count as duplicates when their estimated title+abstract Jaccard
+# similarity, or the containment of one title in the other, reaches these
+CONTENT_THRESHOLD = 0.7
+TITLE_CONTAINMENT_THRESHOLD = 0.9
+MIN_TITLE_SHINGLES = 20
+
+DOI_PATTERN = re.compile(r"10\.\d{4,9}/[^\s\"'<>?#]+", re.I)
+TITLE_TAG_PATTERN = re.compile(r"^\s*(\[[a-z]+\]\s*)+", re.I)
+NON_WORD_PATTERN = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_title(title):
+    """Lowercase ASCII words only, without Scholar's [PDF]/[HTML] tags."""
+    title = TITLE_TAG_PATTERN.sub("", title or "")
+    title = unicodedata.normalize("NFKD", title).encode("ascii", "ignore").decode("ascii")
+    return NON_WORD_PATTERN.sub(" ", title.lower()).strip()
+
+
+def normalize_doi(value):
+    """The bare, lowercase DOI found in a DOI string or URL, else None."""
+    match = DOI_PATTERN.search(unquote(value or ""))
+    if not match:
+        return None
+    return match.group(0).rstrip(".,;)").lower()
+
+
+def _shingles(title, abstract):
+    # Character 4-grams of the title plus word 3-grams of the abstract
+    shingles = {title[i:i + 4] for i in range(max(len(title) - 3, 1))}
+    words = NON_WORD_PATTERN.sub(" ", (abstract or "").lower()).split()
+    shingles.update(" ".join(words[i:i + 3]) for i in range(len(words) - 2))
+    return shingles
+
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(shingles):
+    hashes = [_hash(shingle) for shingle in shingles] or [0]
+    return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in PERMUTATIONS]
+
+
+def _title_containment(a, b):
+    a = {a[i:i + 4] for i in range(max(len(a) - 3, 1))}
+    b = {b[i:i + 4] for i in range(max(len(b) - 3, 1))}
+    smaller = min(len(a), len(b))
+    if smaller < MIN_TITLE_SHINGLES:
+        return 1.0 if a == b else 0.0
+    return len(a & b) / smaller
+
+
+def record_keys(record):
+    """Exact keys (DOIs, normalized URL) and fuzzy inputs (title, abstract) of a scholar record."""
+    full = record.get("full_abstract") or {}
+    link = record.get("link") or ""
+    dois = {doi for doi in (normalize_doi(full.get("DOI")), normalize_doi(link)) if doi}
+    abstract = full.get("Abstract")
+    if not abstract or abstract == "No Abstract Found":
+        abstract = record.get("abstract", "")
+    return {
+        "title": normalize_title(record.get("title", "")),
+        "dois": sorted(dois),
+        "url": normalize_url(link) if link else None,
+        "abstract": abstract if abstract != "N/A" else "",
+    }
+
+
+class DedupIndex:
+    """
+    Near-duplicate index of scholar records.
+
+    A record is a duplicate of an indexed one if they share a DOI, a
+    normalized URL or a normalized title, or if MinHash-LSH over title and
+    abstract shingles finds a candidate that is similar enough. Entries are
+    appended to `path` (JSON Lines) so the index persists across runs; pass
+    path=None for an in-memory index. Records claimed with persist=False are
+    only written once `update` confirms them, so a record that was never
+    saved is not a duplicate in the next run.
+    """
+
+    def __init__(self, path=DEDUP_INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.titles = {}      # id -> normalized title
+        self.signatures = {}  # id -> minhash
+        self.by_key = {}      # "doi:..", "url:..", "title:.." -> id
+        self.buckets = {}     # (band, band hash) -> [ids]
+        self.unsaved = {}     # id -> entries not yet appended to path
+        if path:
+            for entry in iter_records(path):
+                self._index(entry)
+
+    def _index(self, entry):
+        record_id = entry["id"]
+        if record_id not in self.signatures:
+            self.titles[record_id] = entry["title"]
+            self.signatures[record_id] = entry["minhash"]
+            for band in range(BANDS):
+                key = (band, tuple(entry["minhash"][band * ROWS:(band + 1) * ROWS]))
+                self.buckets.setdefault(key, []).append(record_id)
+        for key in entry["keys"]:
+            self.by_key.setdefault(key, record_id)
+
+    def _find(self, keys, signature):
+        for key in keys:
+            if key in self.by_key:
+                return self.by_key[key]
+        own_title = next((key[len("title:"):] for key in keys if key.startswith("title:")), None)
+        seen = set()
+        for band in range(BANDS):
+            for candidate in self.buckets.get((band, tuple(signature[band * ROWS:(band + 1) * ROWS])), ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                other = self.signatures[candidate]
+                similarity = sum(x == y for x, y in zip(signature, other)) / NUM_PERM
+                title = self.titles[candidate]
+                if similarity >= CONTENT_THRESHOLD or (
+                        own_title and title and _title_containment(own_title, title) >= TITLE_CONTAINMENT_THRESHOLD):
+                    return candidate
+        return None
+
+    @staticmethod
+    def _describe(record):
+        info = record_keys(record)
+        keys = [f"doi:{doi}" for doi in info["dois"]]
+        if info["url"]:
+            keys.append(f"url:{info['url']}")
+        if info["title"]:
+            keys.append(f"title:{info['title']}")
+        return info, keys, minhash(_shingles(info["title"], info["abstract"]))
+
+    def find_duplicate(self, record):
+        """Id of an indexed record that `record` duplicates, else None."""
+        _, keys, signature = self._describe(record)
+        with self._lock:
+            return self._find(keys, signature)
+
+    def add(self, record, duplicate_of=None):
+        """
+        Index `record` and return its id. Records are not checked here; use
+        check_and_add to test and insert atomically.
+        """
+        info, keys, signature = self._describe(record)
+        with self._lock:
+            return self._add(info, keys, signature, duplicate_of)
+
+    def _add(self, info, keys, signature, duplicate_of=None, persist=True):
+        record_id = duplicate_of or info["title"] or (keys[0] if keys else str(len(self.signatures)))
+        entry = {"id": record_id, "title": info["title"], "keys": keys, "minhash": signature}
+        if duplicate_of and all(self.by_key.get(key) == duplicate_of for key in keys):
+            return record_id
+        self._index(entry)
+        if not persist or record_id in self.unsaved:
+            self.unsaved.setdefault(record_id, []).append(entry)
+        elif self.path:
+            append_record(self.path, entry)
+        return record_id
+
+    def _flush(self, record_id):
+        for entry in self.unsaved.pop(record_id, ()):
+            if self.path:
+                append_record(self.path, entry)
+
+    def check_and_add(self, record, persist=True):
+        """
+        Index `record` unless it duplicates an indexed one. Returns
+        (id, is_duplicate), where id is the original's for a duplicate. A
+        duplicate's extra keys (e.g. another URL) are recorded against the
+        original so later variants match exactly. With persist=False the
+        record is claimed in memory only until `update` is called for it.
+        """
+        info, keys, signature = self._describe(record)
+        with self._lock:
+            duplicate = self._find(keys, signature)
+            if duplicate is None:
+                return self._add(info, keys, signature, persist=persist), False
+            self._add(info, keys, signature, duplicate_of=duplicate)
+            return duplicate, True
+
+    def update(self, record_id, record):
+        """
+        Add keys learned after indexing (e.g. the DOI found on the fetched
+        page) to `record_id` and persist it if it was claimed in memory.
+        Returns the id of another record that already owns one of those keys,
+        i.e. that `record` turned out to duplicate, else None.
+        """
+        info, keys, signature = self._describe(record)
+        with self._lock:
+            for key in keys:
+                owner = self.by_key.get(key)
+                if owner is not None and owner != record_id:
+                    self.unsaved.pop(record_id, None)
+                    return owner
+            self._add(info, keys, signature, duplicate_of=record_id)
+            self._flush(record_id)
+            return None
+
+    def __len__(self):
+        return len(self.signatures)
@@ -0,0 +1,154 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class DriverPool:
+    """
+    Bounded pool of long-lived browser drivers.
+
+    Drivers are created lazily by `factory` (up to `size` of them), handed out
+    with `borrow()` and returned to the pool afterwards. A driver is recycled
+    after serving `max_pages` pages, or immediately if a page load raised.
+    """
+
+    def __init__(self, factory, size=2, max_pages=50):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = []
+        self._pages = {}
+        self._created = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _acquire(self, timeout=None):
+        # Reuse an idle driver, start a new one while under the limit, otherwise
+        # wait until a driver is returned or a discarded driver frees its slot
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("DriverPool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("no driver became available")
+                self._cond.wait(remaining)
+
+        try:
+            driver = self.factory()
+        except Exception:
+            self._free_slot()
+            raise
+        with self._cond:
+            self._pages[id(driver)] = 0
+        return driver
+
+    def _free_slot(self):
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def _discard(self, driver):
+        # Quit a driver and free its slot so a waiter can start a fresh one
+        with self._cond:
+            self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"⚠️ Error closing driver: {e}")
+        self._free_slot()
+
+    def _release(self, driver, broken=False):
+        with self._cond:
+            self._pages[id(driver)] = self._pages.get(id(driver), 0) + 1
+            recycle = broken or self._closed or self._pages[id(driver)] >= self.max_pages
+            if not recycle:
+                self._idle.append(driver)
+                self._cond.notify()
+        if recycle:
+            self._discard(driver)
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        """Borrow a driver for a single page load."""
+        driver = self._acquire(timeout=timeout)
+        try:
+            yield driver
+        except Exception:
+            self._release(driver, broken=True)
+            raise
+        self._release(driver)
+
+    def close(self):
+        """Quit every idle driver; drivers still borrowed are quit on return."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._discard(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeDriverError(Exception):
+    pass
+
+
+class FakeDriver:
+    """
+    Local stand-in for a Selenium driver that serves HTML files from disk.
+
+    Pages are looked up in `pages` (URL -> file path) first, then as
+    `<root>/<sha1 of url>.html`. Useful for exercising the pool and the
+    scraping code without Chrome or network access.
+    """
+
+    def __init__(self, root=".", pages=None):
+        self.root = root
+        self.pages = pages or {}
+        self.page_source = ""
+        self.current_url = None
+        self.pages_loaded = 0
+        self.closed = False
+
+    @staticmethod
+    def filename_for(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest() + ".html"
+
+    def get(self, url):
+        if self.closed:
+            raise FakeDriverError("driver has been quit")
+        path = self.pages.get(url) or os.path.join(self.root, self.filename_for(url))
+        if not os.path.exists(path):
+            raise FakeDriverError(f"no local page for {url}")
+        with open(path, "r", encoding="utf-8") as f:
+            self.page_source = f.read()
+        self.current_url = url
+        self.pages_loaded += 1
+
+    def find_elements(self, by, value):
+        # Local pages are fully rendered, so any readiness condition is met at once
+        return [self.page_source] if self.page_source else []
+
+    def quit(self):
+        self.closed = True
+
+
+def fake_driver_factory(root=".", pages=None):
+    """Return a factory producing FakeDriver instances for DriverPool."""
+    return lambda: FakeDriver(root=root, pages=pages)
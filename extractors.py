@@ -0,0 +1,317 @@
+import re
+from urllib.parse import unquote, urlparse
+
+# Placeholders stored when a field isn't found, as the scraper always has
+MISSING = {
+    "Title": "No Title Found",
+    "Authors": "No Authors Found",
+    "Abstract": "No Abstract Found",
+    "DOI": "No DOI Found",
+    "Keywords": "No Keywords Found",
+    "Full Text Content": "No Full Text Available",
+}
+
+# Characters of page text kept when no article body or abstract is found
+PAGE_TEXT_LIMIT = 10000
+
+# Never content; dropped before any text is read
+SCRIPT_TAGS = ("script", "style", "noscript", "template")
+# Page chrome, dropped only when falling back to the whole page text
+CHROME_TAGS = ("nav", "footer", "aside", "form", "header")
+
+DOI_PATTERN = re.compile(r"10\.\d{4,9}/\S+")
+KEYWORDS_LABEL = re.compile(r"^\s*key\s*words?\s*:?\s*", re.I)
+KEYWORD_SEPARATOR = re.compile(r"\s*[;,]\s*")
+
+
+def has_class(name):
+    """XPath predicate matching `name` as a whole class token."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def parse_html(html_content):
+    """lxml tree of a page, with scripts and styles removed."""
+    try:
+        import lxml.html
+        from lxml import etree
+    except ImportError:
+        raise RuntimeError("HTML extraction needs 'lxml' installed")
+    try:
+        tree = lxml.html.document_fromstring(html_content)
+    except ValueError:
+        # XHTML with an encoding declaration is only accepted as bytes
+        tree = lxml.html.document_fromstring(html_content.encode("utf-8"),
+                                             parser=lxml.html.HTMLParser(encoding="utf-8"))
+    etree.strip_elements(tree, *SCRIPT_TAGS, with_tail=False)
+    return tree
+
+
+def node_text(node):
+    """Text of a node with its pieces separated by single spaces."""
+    # str.split() collapses whitespace several times faster than a regex
+    if isinstance(node, str):
+        return " ".join(node.split())
+    return " ".join(" ".join(node.itertext()).split())
+
+
+def first_text(tree, xpaths):
+    """Text of the first node matched by the first of `xpaths` that finds a non-empty one."""
+    for xpath in xpaths:
+        for node in tree.xpath(xpath):
+            text = node_text(node)
+            if text:
+                return text
+    return ""
+
+
+def all_texts(tree, xpaths):
+    """Texts of every node matched by the first of `xpaths` that matches any."""
+    for xpath in xpaths:
+        texts = [text for text in map(node_text, tree.xpath(xpath)) if text]
+        if texts:
+            return texts
+    return []
+
+
+def normalize_doi(value):
+    match = DOI_PATTERN.search(unquote(value or ""))
+    return f"https://doi.org/{match.group().rstrip('.')}" if match else ""
+
+
+def keywords_text(values):
+    keywords = []
+    for value in values:
+        keywords += [k for k in KEYWORD_SEPARATOR.split(KEYWORDS_LABEL.sub("", value)) if k]
+    return "; ".join(dict.fromkeys(keywords))
+
+
+def meta_tags(tree):
+    """{lowercased name or property: [contents]} of every <meta> tag, in one pass."""
+    tags = {}
+    for meta in tree.iter("meta"):
+        name = meta.get("name") or meta.get("property")
+        content = node_text(meta.get("content") or "")
+        if name and content:
+            tags.setdefault(name.lower(), []).append(content)
+    return tags
+
+
+def meta_values(tags, *names):
+    """Contents of the first of `names` present in `tags`."""
+    for name in names:
+        if name in tags:
+            return tags[name]
+    return []
+
+
+def meta_fields(tags):
+    """
+    The article fields publishers put in Highwire citation_* tags (read by
+    Google Scholar, so nearly every journal has them) and Dublin Core tags.
+    They are served with the static page, before any script runs.
+    """
+    fields = {}
+    title = meta_values(tags, "citation_title", "dc.title")
+    if title:
+        fields["Title"] = title[0]
+    authors = meta_values(tags, "citation_author", "dc.creator")
+    if authors:
+        fields["Authors"] = ", ".join(dict.fromkeys(authors))
+    abstract = meta_values(tags, "citation_abstract", "dc.description")
+    if abstract:
+        fields["Abstract"] = max(abstract, key=len)
+    doi = normalize_doi(" ".join(meta_values(tags, "citation_doi", "dc.identifier", "prism.doi")))
+    if doi:
+        fields["DOI"] = doi
+    keywords = meta_values(tags, "citation_keywords", "keywords", "dc.subject")
+    if keywords:
+        fields["Keywords"] = keywords_text(keywords)
+    return fields
+
+
+# The selectors the scraper always used, for pages without publisher rules or meta tags
+GENERIC_FIELDS = {
+    "Title": lambda tree: first_text(tree, ["//h1", "//h2"]),
+    "Authors": lambda tree: first_text(tree, [f"//div[{has_class('authors')}]", f"//span[{has_class('authors')}]"]),
+    "Abstract": lambda tree: first_text(tree, [f"//div[{has_class('abstract-content')}]",
+                                               f"//section[{has_class('abstract')}]"]),
+    "DOI": lambda tree: normalize_doi(first_text(tree, ["//a[contains(@href, 'doi.org')]/@href"])),
+    "Keywords": lambda tree: keywords_text(all_texts(tree, [f"//section[{has_class('keywords')}]",
+                                                            f"//p[{has_class('keywords')}]"])),
+    "Full Text Content": lambda tree: first_text(tree, [f"//div[{has_class('full-text')}]", "//article"]),
+}
+
+
+class PublisherRules:
+    """
+    XPaths going straight to the abstract, keywords and article body of one
+    publisher's pages. Only the fields a rule finds override the meta tags.
+    """
+
+    def __init__(self, name, abstract=(), keywords=(), full_text=(), title=(), authors=()):
+        self.name = name
+        self.xpaths = {"Title": title, "Authors": authors, "Abstract": abstract, "Full Text Content": full_text}
+        self.keywords = keywords
+
+    def __call__(self, tree):
+        fields = {field: first_text(tree, xpaths) for field, xpaths in self.xpaths.items() if xpaths}
+        if self.keywords:
+            fields["Keywords"] = keywords_text(all_texts(tree, self.keywords))
+        return {field: value for field, value in fields.items() if value}
+
+
+# Host (or parent domain) -> extractor; see register_extractor
+EXTRACTORS = {}
+
+
+def register_extractor(extractor, *domains):
+    """Use `extractor` (tree -> partial fields dict, with a .name) for pages on `domains` and their subdomains."""
+    for domain in domains:
+        EXTRACTORS[domain.lower()] = extractor
+    return extractor
+
+
+def extractor_for(url):
+    host = (urlparse(url or "").hostname or "").lower()
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        extractor = EXTRACTORS.get(".".join(parts[i:]))
+        if extractor is not None:
+            return extractor
+    return None
+
+
+register_extractor(PublisherRules(
+    "pmc",
+    abstract=[f"//section[{has_class('abstract')}]", f"//div[{has_class('abstract')}]"],
+    keywords=[f"//section[{has_class('kwd-group')}]//*[{has_class('kwd')} or self::li]",
+              f"//*[{has_class('kwd-group')}]"],
+    full_text=[f"//section[{has_class('main-article-body')}]", f"//div[{has_class('jig-ncbiinpagenav')}]"],
+), "pmc.ncbi.nlm.nih.gov", "ncbi.nlm.nih.gov", "europepmc.org")
+
+register_extractor(PublisherRules(
+    "pubmed",
+    abstract=["//div[@id='eng-abstract']", f"//div[{has_class('abstract-content')}]"],
+    keywords=[f"//div[{has_class('abstract')}]//p[strong[contains(., 'Keywords')]]"],
+), "pubmed.ncbi.nlm.nih.gov")
+
+register_extractor(PublisherRules(
+    "lww",
+    abstract=["//*[@id='abstractWrap']", f"//*[{has_class('ejp-article-abstract')}]"],
+    keywords=["//*[@id='ej-article-keywords']//a", f"//*[{has_class('ej-keywords')}]"],
+    full_text=["//*[@id='ArticleBody']", f"//*[{has_class('ejp-article-text-body')}]"],
+), "journals.lww.com")
+
+register_extractor(PublisherRules(
+    "springer",
+    abstract=["//*[@id='Abs1-content']", "//section[@data-title='Abstract']//div[contains(@class, 'c-article-section__content')]"],
+    keywords=[f"//ul[{has_class('c-article-subject-list')}]/li"],
+    full_text=[f"//div[{has_class('c-article-body')}]", "//*[@id='body']"],
+), "link.springer.com", "springeropen.com", "biomedcentral.com", "nature.com")
+
+register_extractor(PublisherRules(
+    "wiley",
+    abstract=[f"//section[{has_class('article-section__abstract')}]//div[{has_class('article-section__content')}]",
+              f"//div[{has_class('abstract-group')}]"],
+    keywords=[f"//section[{has_class('keywords')}]//a", f"//ul[{has_class('keywords-list')}]/li"],
+    full_text=[f"//section[{has_class('article-section__full')}]"],
+), "onlinelibrary.wiley.com")
+
+register_extractor(PublisherRules(
+    "sciencedirect",
+    abstract=[f"//div[{has_class('abstract')} and {has_class('author')}]", "//*[@id='abstracts']"],
+    keywords=[f"//div[{has_class('keyword')}]"],
+    full_text=["//*[@id='body']"],
+), "sciencedirect.com")
+
+register_extractor(PublisherRules(
+    "tandfonline",
+    abstract=[f"//div[{has_class('abstractSection')}]", f"//div[{has_class('hlFld-Abstract')}]"],
+    keywords=[f"//div[{has_class('abstractKeywords')}]//a"],
+    full_text=[f"//div[{has_class('hlFld-Fulltext')}]"],
+), "tandfonline.com")
+
+register_extractor(PublisherRules(
+    "mdpi",
+    abstract=[f"//section[{has_class('html-abstract')}]", f"//div[{has_class('art-abstract')}]"],
+    keywords=[f"//div[{has_class('art-keywords')}]//a"],
+    full_text=[f"//div[{has_class('html-body')}]"],
+), "mdpi.com")
+
+register_extractor(PublisherRules(
+    "frontiers",
+    abstract=[f"//div[{has_class('JournalAbstract')}]//p"],
+    full_text=[f"//div[{has_class('JournalFullText')}]"],
+), "frontiersin.org")
+
+register_extractor(PublisherRules(
+    "sage",
+    abstract=["//section[@id='abstract']", f"//div[{has_class('abstractSection')}]"],
+    keywords=[f"//section[{has_class('keywords')}]//li", f"//div[{has_class('hlFld-KeywordText')}]//a"],
+    full_text=["//section[@id='bodymatter']", f"//div[{has_class('hlFld-Fulltext')}]"],
+), "journals.sagepub.com")
+
+register_extractor(PublisherRules(
+    "oup",
+    abstract=[f"//section[{has_class('abstract')}]"],
+    keywords=[f"//div[{has_class('kwd-group')}]//a"],
+    full_text=[f"//div[@data-widgetname='ArticleFulltext']"],
+), "academic.oup.com")
+
+
+def extract_article(html_content, url="", tree=None):
+    """
+    Article fields of a publisher page: the publisher's rules (if any are
+    registered for its domain) first, then the citation_* meta tags, then the
+    generic selectors. The article body falls back to the abstract, and only
+    without either to the first PAGE_TEXT_LIMIT characters of the page.
+    Pass the page's `tree` from content_tree() to skip parsing it again; the
+    tree may be modified.
+    Returns (fields, extractor name) with the usual placeholders for what wasn't found.
+    """
+    if tree is None:
+        tree = parse_html(html_content)
+    tags = meta_tags(tree)
+    extractor = extractor_for(url)
+    found = extractor(tree) if extractor is not None else {}
+    meta = meta_fields(tags)
+    fields = {**meta, **found}
+    name = extractor.name if found else "meta" if meta else "generic"
+    # Generic selectors only for what is still missing: reading a body's text is the costly part
+    for field, extract in GENERIC_FIELDS.items():
+        if not fields.get(field):
+            fields[field] = extract(tree)
+    if not fields.get("Abstract"):
+        # Page descriptions are often a cut-down abstract; better than none
+        description = meta_values(tags, "og:description", "description")
+        if description:
+            fields["Abstract"] = max(description, key=len)
+
+    if not fields.get("Full Text Content"):
+        if fields.get("Abstract"):
+            fields["Full Text Content"] = fields["Abstract"]
+        else:
+            from lxml import etree
+            etree.strip_elements(tree, *CHROME_TAGS, with_tail=False)
+            body = tree.find("body")
+            fields["Full Text Content"] = node_text(body if body is not None else tree)[:PAGE_TEXT_LIMIT]
+    return {field: fields.get(field) or placeholder for field, placeholder in MISSING.items()}, name
+
+
+def content_tree(html_content):
+    """
+    The parsed page if it already carries an abstract or a DOI (so it needs no
+    browser), else None. The tree can be handed on to extract_article.
+    """
+    tree = parse_html(html_content)
+    if meta_values(meta_tags(tree), "citation_abstract", "citation_doi"):
+        return tree
+    if tree.xpath(f"//div[{has_class('abstract-content')}] | //section[{has_class('abstract')}]"
+                  " | //a[contains(@href, 'doi.org')]"):
+        return tree
+    return None
+
+
+def has_article_content(html_content):
+    """Whether a page already carries an abstract or a DOI (so it needs no browser)."""
+    return content_tree(html_content) is not None
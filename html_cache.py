@@ -0,0 +1,227 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+
+
+def normalize_url(url):
+    """Canonical form of a URL so trivially different spellings share a cache entry."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def url_digest(url):
+    """Stable (process independent) key for a URL."""
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+
+class HtmlCache:
+    """
+    Persistent, content-addressed store of fetched HTML pages.
+
+    Pages live in `root` under the SHA-256 of their normalized URL and are
+    described by `root/index.json` (url -> path, fetch time, status, size).
+    Changes since the index was last written are appended to
+    `root/index.log` and folded into index.json once the log outgrows it, or
+    on `flush()`/`close()`. Entries older than `ttl` seconds are treated as
+    misses, and the oldest entries are evicted once the cache grows past
+    `max_bytes`; a single page larger than that is not cached at all.
+    """
+
+    INDEX_NAME = "index.json"
+    LOG_NAME = "index.log"
+    # The log is folded into index.json once it has more lines than this and than the index has entries
+    MIN_LOG_LINES = 1000
+
+    def __init__(self, root="html_cache", ttl=None, max_bytes=None, compress=False):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.index_path = os.path.join(root, self.INDEX_NAME)
+        self.log_path = os.path.join(root, self.LOG_NAME)
+        self.index = self._load_index()
+        self._log_lines = self._replay_log()
+        self.index = dict(sorted(self.index.items(), key=lambda item: item[1]["fetched_at"]))
+        self._size = sum(entry["size"] for entry in self.index.values())
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                try:
+                    return json.load(f)
+                except json.JSONDecodeError:
+                    return {}
+        return {}
+
+    def _replay_log(self):
+        if not os.path.exists(self.log_path):
+            return 0
+        lines = 0
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    change = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append can only truncate the final line
+                    continue
+                lines += 1
+                self.index.pop(change["url"], None)
+                if change["entry"] is not None:
+                    self.index[change["url"]] = change["entry"]
+        return lines
+
+    def _log(self, key, entry):
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"url": key, "entry": entry}, ensure_ascii=False) + "\n")
+        self._log_lines += 1
+        if self._log_lines > max(self.MIN_LOG_LINES, len(self.index)):
+            self._save_index()
+
+    def _save_index(self):
+        # Write to a temporary file first so a crash never leaves a truncated index
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+        # Everything in the log is now in index.json
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._log_lines = 0
+
+    def _expired(self, entry):
+        return self.ttl is not None and time.time() - entry["fetched_at"] > self.ttl
+
+    def _forget(self, key):
+        entry = self.index.pop(key)
+        self._size -= entry["size"]
+        self._log(key, None)
+        return entry
+
+    def get(self, url):
+        """Return the cached HTML for `url`, or None on a miss."""
+        key = normalize_url(url)
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None or self._expired(entry):
+                self.misses += 1
+                return None
+            path = os.path.join(self.root, entry["path"])
+            try:
+                if path.endswith(".gz"):
+                    with gzip.open(path, "rt", encoding="utf-8") as f:
+                        html = f.read()
+                else:
+                    with open(path, "r", encoding="utf-8") as f:
+                        html = f.read()
+            except OSError:
+                # Page file vanished behind our back; forget it
+                self._forget(key)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return html
+
+    def put(self, url, html, status=200):
+        """Store `html` for `url` and return the path of the page file, or None if it is too large to cache."""
+        key = normalize_url(url)
+        name = url_digest(url) + (".html.gz" if self.compress else ".html")
+        path = os.path.join(self.root, name)
+        data = html.encode("utf-8")
+        if self.compress:
+            data = gzip.compress(data)
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            return None
+
+        with self._lock:
+            if key in self.index:
+                old = self.index.pop(key)
+                self._size -= old["size"]
+                if old["path"] != name:
+                    self._remove_file(old["path"])
+            # Written next to its final path and renamed, so a crash never leaves a truncated page
+            tmp_path = f"{path}.tmp{threading.get_ident()}"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            entry = {
+                "path": name,
+                "fetched_at": time.time(),
+                "status": status,
+                "size": len(data),
+            }
+            # Re-inserted last, so the index stays ordered oldest fetch first
+            self.index[key] = entry
+            self._size += entry["size"]
+            self._log(key, entry)
+            self._evict_oldest()
+        return path
+
+    def _remove_file(self, name):
+        try:
+            os.remove(os.path.join(self.root, name))
+        except OSError:
+            pass
+
+    def _evict_oldest(self):
+        # The index is ordered by fetch time, so the oldest entries come first
+        if self.max_bytes is None:
+            return
+        while self._size > self.max_bytes and self.index:
+            key = next(iter(self.index))
+            self._remove_file(self._forget(key)["path"])
+
+    def _evict(self):
+        # Drop expired entries, then the oldest ones until we fit in max_bytes
+        for key, entry in list(self.index.items()):
+            if self._expired(entry):
+                self._remove_file(entry["path"])
+                self._forget(key)
+        self._evict_oldest()
+
+    def evict(self):
+        """Apply TTL and size limits now."""
+        with self._lock:
+            self._evict()
+            self._save_index()
+
+    def flush(self):
+        """Fold the change log into index.json."""
+        with self._lock:
+            if self._log_lines:
+                self._save_index()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, url):
+        entry = self.index.get(normalize_url(url))
+        return entry is not None and not self._expired(entry)
+
+    def __len__(self):
+        return len(self.index)
@@ -1,13 +1,123 @@
-import json
-import pandas as pd
-
-def json_to_csv(json_file, csv_file):
-    with open(json_file, 'r', encoding='utf-8') as f:  # Specify encoding
-        data = json.load(f)
-    
-    df = pd.DataFrame(data)
-    df.to_csv(csv_file, index=False, encoding='utf-8')  # Ensure CSV uses UTF-8
-    print(f"CSV file saved as {csv_file}")
-
-# Example usage
-json_to_csv('scholar_results.json', 'output.csv')
+import argparse
+import csv
+import os
+from itertools import islice
+
+from result_store import iter_records
+from blob_store import load_text
+
+# Top-level fields, then every full_abstract field as its own "full_abstract.<Field>" column
+RECORD_FIELDS = ["title", "author", "publication_year", "abstract", "citation_count", "link"]
+FULL_ABSTRACT_FIELDS = ["Title", "Authors", "Abstract", "DOI", "Keywords",
+                        "Full Text Content", "Cleaned Text Content"]
+COLUMNS = RECORD_FIELDS + [f"full_abstract.{field}" for field in FULL_ABSTRACT_FIELDS]
+INTEGER_COLUMNS = ("publication_year", "citation_count")
+AUTHOR_SEPARATOR = "; "
+
+# Records held in memory at once, whatever the size of the input
+CHUNK_SIZE = 1000
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def flatten_record(record):
+    """One flat row per record: authors joined into one string, full_abstract.* as columns, numbers as ints."""
+    row = {field: record.get(field) for field in RECORD_FIELDS}
+    if isinstance(row["author"], list):
+        row["author"] = AUTHOR_SEPARATOR.join(row["author"])
+    for column in INTEGER_COLUMNS:
+        row[column] = _to_int(row[column])
+    full_abstract = record.get("full_abstract") or {}
+    for field in FULL_ABSTRACT_FIELDS:
+        row[f"full_abstract.{field}"] = load_text(full_abstract.get(field))
+    return row
+
+def iter_chunks(records, chunk_size=CHUNK_SIZE):
+    """Flattened rows in lists of at most `chunk_size`."""
+    rows = (flatten_record(record) for record in records)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def arrow_schema():
+    """The fixed schema of Parquet/Arrow exports, so every file (and every chunk) has the same column types."""
+    import pyarrow as pa
+
+    types = {"publication_year": pa.int32(), "citation_count": pa.int64()}
+    return pa.schema([(column, types.get(column, pa.string())) for column in COLUMNS])
+
+class CsvWriter:
+    """Appends chunks of flat rows to a UTF-8 CSV file."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, chunk):
+        self.writer.writerows(chunk)
+
+    def close(self):
+        self.file.close()
+
+class ArrowWriter:
+    """
+    Appends chunks of flat rows to a Parquet file (one row group per chunk),
+    or to an Arrow IPC file for .arrow/.feather paths.
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet/Arrow export needs 'pyarrow' installed")
+        self.table = pa.Table.from_pylist
+        self.schema = arrow_schema()
+        if os.path.splitext(path)[1] in (".arrow", ".feather"):
+            self.writer = pa.ipc.new_file(path, self.schema)
+        else:
+            self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, chunk):
+        self.writer.write_table(self.table(chunk, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+def json_to_csv(json_file, csv_file=None, parquet_file=None, chunk_size=CHUNK_SIZE):
+    """
+    Streams a results file into a flat CSV and/or Parquet (or Arrow) file in
+    one pass, holding at most `chunk_size` records in memory.
+    """
+    writers = []
+    try:
+        if csv_file:
+            writers.append(CsvWriter(csv_file))
+        if parquet_file:
+            writers.append(ArrowWriter(parquet_file))
+        count = 0
+        for chunk in iter_chunks(iter_records(json_file), chunk_size):
+            for writer in writers:
+                writer.write(chunk)
+            count += len(chunk)
+    finally:
+        for writer in writers:
+            writer.close()
+    for path in (csv_file, parquet_file):
+        if path:
+            print(f"✅ Saved {count} records to {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export scholar results as flat CSV and/or Parquet.")
+    parser.add_argument("--input", default="scholar_results.jsonl")
+    parser.add_argument("--csv", default="output.csv", help="CSV file to write ('' to skip)")
+    parser.add_argument("--parquet", help="Parquet file to write (.arrow/.feather for Arrow IPC)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    json_to_csv(args.input, args.csv or None, args.parquet, chunk_size=args.chunk_size)
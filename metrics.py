@@ -0,0 +1,232 @@
+import cProfile
+import json
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+METRICS_FILE = "metrics.jsonl"
+
+# Stages to profile, comma-separated, or "all"; and the profiler to use:
+# "cprofile" (a .prof file per stage, for snakeviz/pstats) or "py-spy" (a
+# flamegraph per stage, recorded by a py-spy process attached to ours)
+PROFILE_ENV = "SCHOLAR_PROFILE"
+PROFILER_ENV = "SCHOLAR_PROFILER"
+PROFILE_DIR = "profiles"
+
+# cProfile can only have one active profiler per process on newer Pythons
+_cprofile_lock = threading.Lock()
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label(key):
+    name, labels = key
+    if not labels:
+        return name
+    return f"{name}{{{','.join(f'{k}={v}' for k, v in labels)}}}"
+
+
+class Metrics:
+    """
+    Thread-safe counters and timers, keyed by name plus optional labels
+    (e.g. fetch.static{host=...}). A timer keeps the count, total, min and
+    max of its observations. Worker processes send a snapshot() back to be
+    merge()d into the parent's registry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.timers = {}
+
+    def count(self, name, n=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            stats = self.timers.get(key)
+            if stats is None:
+                self.timers[key] = [1, seconds, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = min(stats[2], seconds)
+                stats[3] = max(stats[3], seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def total(self, name, **labels):
+        """Sum of a counter over every label set that includes `labels`."""
+        wanted = set(_key(name, labels)[1])
+        with self._lock:
+            return sum(value for (key_name, key_labels), value in self.counters.items()
+                       if key_name == name and wanted <= set(key_labels))
+
+    def seconds(self, name, **labels):
+        """Total time of a timer over every label set that includes `labels`."""
+        wanted = set(_key(name, labels)[1])
+        with self._lock:
+            return sum(stats[1] for (key_name, key_labels), stats in self.timers.items()
+                       if key_name == name and wanted <= set(key_labels))
+
+    def snapshot(self, reset=False):
+        """Picklable copy of every metric; with reset=True the registry starts over."""
+        with self._lock:
+            snapshot = {"counters": list(self.counters.items()),
+                        "timers": [(key, list(stats)) for key, stats in self.timers.items()]}
+            if reset:
+                self.counters.clear()
+                self.timers.clear()
+        return snapshot
+
+    def merge(self, snapshot):
+        with self._lock:
+            for key, value in snapshot["counters"]:
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, (count, total, low, high) in snapshot["timers"]:
+                stats = self.timers.get(key)
+                if stats is None:
+                    self.timers[key] = [count, total, low, high]
+                else:
+                    stats[0] += count
+                    stats[1] += total
+                    stats[2] = min(stats[2], low)
+                    stats[3] = max(stats[3], high)
+
+    def rates(self):
+        """The derived figures we actually watch, for whatever ran in this process."""
+        rates = {}
+        pages = self.total("fetch.pages")
+        if pages:
+            rates["fetch cache hit rate"] = f"{self.total('fetch.pages', tier='cache') / pages:.1%}"
+        generate_seconds = self.seconds("summarize.generate")
+        if generate_seconds:
+            rates["summarize tokens/s"] = f"{self.total('summarize.tokens') / generate_seconds:.1f}"
+        chunk_seconds = self.seconds("summarize.generate", stage="chunk")
+        if chunk_seconds:
+            rates["summarize chunks/s"] = f"{self.total('summarize.generated', stage='chunk') / chunk_seconds:.2f}"
+        summaries = self.total("summarize.generated") + self.total("summarize.fallbacks")
+        if summaries:
+            rates["summary fallback rate"] = f"{self.total('summarize.fallbacks') / summaries:.1%}"
+        return rates
+
+    def summary_table(self):
+        """End-of-run table: timers (by total time), counters, then the derived rates."""
+        with self._lock:
+            timers = sorted(self.timers.items(), key=lambda item: -item[1][1])
+            counters = sorted(self.counters.items())
+        lines = []
+        if timers:
+            width = max(len(_label(key)) for key, _ in timers)
+            lines.append(f"{'timer':<{width}} {'count':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9}")
+            for key, (count, total, _, high) in timers:
+                lines.append(f"{_label(key):<{width}} {count:>7} {total:>9.2f} "
+                             f"{1000 * total / count:>9.1f} {1000 * high:>9.1f}")
+        if counters:
+            width = max(len(_label(key)) for key, _ in counters)
+            lines.append("")
+            lines.append(f"{'counter':<{width}} {'value':>9}")
+            for key, value in counters:
+                lines.append(f"{_label(key):<{width}} {value:>9}")
+        rates = self.rates()
+        if rates:
+            lines.append("")
+            for name, value in rates.items():
+                lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+    def export(self, path=METRICS_FILE, **context):
+        """
+        Append one JSON line per metric to `path`, tagged with a run id, the
+        time and any `context` (e.g. the pipeline targets). Returns the run id.
+        """
+        run_id = uuid.uuid4().hex[:12]
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        snapshot = self.snapshot()
+        with open(path, "a", encoding="utf-8") as f:
+            for (name, labels), value in snapshot["counters"]:
+                f.write(json.dumps({"run": run_id, "time": stamp, **context, "type": "counter",
+                                    "name": name, "labels": dict(labels), "value": value}) + "\n")
+            for (name, labels), (count, total, low, high) in snapshot["timers"]:
+                f.write(json.dumps({"run": run_id, "time": stamp, **context, "type": "timer",
+                                    "name": name, "labels": dict(labels), "count": count,
+                                    "total": round(total, 6), "min": round(low, 6),
+                                    "max": round(high, 6)}) + "\n")
+        return run_id
+
+
+# Process-wide registry used by the scraper, summarizer and pipeline
+metrics = Metrics()
+
+
+def profiled_stages():
+    selected = os.environ.get(PROFILE_ENV, "")
+    return {name.strip() for name in selected.split(",") if name.strip()}
+
+
+@contextmanager
+def profile_stage(name, stages=None, profiler=None):
+    """
+    Profile the block when `name` is among `stages` (default: the
+    SCHOLAR_PROFILE environment variable). cProfile writes
+    profiles/<name>.prof for the calling thread, one stage at a time;
+    py-spy, if installed, records profiles/<name>.svg from a separate
+    process, covering every thread and worker process.
+    """
+    stages = profiled_stages() if stages is None else set(stages)
+    if name not in stages and "all" not in stages:
+        yield
+        return
+    profiler = profiler or os.environ.get(PROFILER_ENV, "cprofile")
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    if profiler == "py-spy":
+        if shutil.which("py-spy") is None:
+            raise RuntimeError("The py-spy profiler needs 'py-spy' installed")
+        output = os.path.join(PROFILE_DIR, f"{name}.svg")
+        spy = subprocess.Popen(["py-spy", "record", "--pid", str(os.getpid()), "--threads",
+                                "--subprocesses", "--output", output])
+        try:
+            yield
+        finally:
+            # py-spy writes its flamegraph when interrupted
+            spy.send_signal(signal.SIGINT)
+            spy.wait()
+            print(f"Profile of {name} saved in {output}")
+        return
+
+    if profiler != "cprofile":
+        raise ValueError(f"Unknown profiler '{profiler}', expected 'cprofile' or 'py-spy'")
+    if not _cprofile_lock.acquire(blocking=False):
+        print(f"⚠️ Another stage is being profiled; running {name} without cProfile")
+        yield
+        return
+    output = os.path.join(PROFILE_DIR, f"{name}.prof")
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(output)
+            print(f"Profile of {name} saved in {output}")
+    finally:
+        _cprofile_lock.release()
@@ -0,0 +1,359 @@
+import argparse
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+ABSTRACTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Abstraction")
+sys.path.insert(0, ABSTRACTION_DIR)
+from checkpoint import Checkpoint, content_hash
+from result_store import iter_records, tee_records
+from metrics import METRICS_FILE, metrics, profile_stage, profiled_stages
+from summary_profiles import PROFILE_FILES
+
+STATE_FILE = ".pipeline_state.json"
+
+# Files passed between stages (relative to the working directory)
+RESULTS_FILE = "scholar_results.jsonl"
+DEDUP_FILE = "scholar_results_dedup.jsonl"
+CLEAN_FILE = "scholar_results_clean.jsonl"
+CSV_FILE = "output.csv"
+PDF_FILE = "Exercise_snacking_Study.pdf"
+SEARCH_INDEX_FILE = "search_index.sqlite"
+EMBEDDINGS_DIR = "embeddings"
+TOPICS_FILE = os.path.join(EMBEDDINGS_DIR, "clusters.json")
+FONT_PATH = os.path.join(ABSTRACTION_DIR, "DejaVuSans.ttf")
+
+DEFAULT_TARGETS = ("export", "search", "pdf")
+HASH_BLOCK_SIZE = 1 << 20
+
+
+class Stage:
+    """
+    One step of the pipeline, with the files it reads and writes. A stage
+    depends on the stages that produce its inputs; `optional_inputs` count
+    towards its freshness when they exist but add no dependency.
+
+    A stage either does its work in `run()`, or is a record `transform`
+    (records in, records out) from its single input to its single output.
+    Consecutive transforms are streamed into each other in one pass.
+    """
+
+    def __init__(self, name, inputs=(), outputs=(), run=None, transform=None, params=None, optional_inputs=()):
+        if (run is None) == (transform is None):
+            raise ValueError(f"Stage '{name}' needs exactly one of run or transform")
+        if transform is not None and (len(inputs) != 1 or len(outputs) != 1):
+            raise ValueError(f"Transform stage '{name}' needs exactly one input and one output")
+        self.name = name
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.run = run
+        self.transform = transform
+        self.params = params
+        self.optional_inputs = list(optional_inputs)
+
+
+class Pipeline:
+    """
+    Runs a DAG of stages. A stage is skipped when its outputs exist and the
+    content of its inputs (and its params) is unchanged since it last
+    succeeded. Stages whose dependencies are done run in parallel, up to
+    `jobs` at a time. A stale transform stage is streamed straight into the
+    transforms that consume its output, each output file being written as
+    the records pass through; those downstream stages rerun in that case,
+    relying on their own per-record checkpoints to stay cheap.
+    """
+
+    def __init__(self, stages, state_file=STATE_FILE):
+        self.stages = {stage.name: stage for stage in stages}
+        self.producers = {path: stage.name for stage in stages for path in stage.outputs}
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self.state = {"stages": {}, "files": {}}
+        if os.path.exists(state_file):
+            with open(state_file, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def _save_state(self):
+        # Called with self._lock held
+        tmp_path = self.state_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp_path, self.state_file)
+
+    def dependencies(self, name):
+        return [self.producers[path] for path in self.stages[name].inputs if path in self.producers]
+
+    def plan(self, targets):
+        """`targets` and everything they depend on, dependencies first."""
+        ordered = []
+
+        def visit(name, path):
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage '{name}'; expected one of {sorted(self.stages)}")
+            if name in path:
+                raise ValueError(f"Cycle through stage '{name}'")
+            if name in ordered:
+                return
+            for dependency in self.dependencies(name):
+                visit(dependency, path + [name])
+            ordered.append(name)
+
+        for target in targets:
+            visit(target, [])
+        return ordered
+
+    def file_hash(self, path):
+        """SHA-256 of a file's content, recomputed only when its size or mtime changed."""
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        with self._lock:
+            cached = self.state["files"].get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        with self._lock:
+            self.state["files"][path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def input_hash(self, name):
+        stage = self.stages[name]
+        paths = stage.inputs + stage.optional_inputs
+        return content_hash({"params": stage.params, "inputs": {path: self.file_hash(path) for path in paths}})
+
+    def status(self, name):
+        """'up to date', 'stale' or 'not built'."""
+        stage = self.stages[name]
+        if not all(os.path.exists(path) for path in stage.outputs):
+            return "not built"
+        if not stage.inputs and not stage.optional_inputs and stage.params is None:
+            # Nothing to compare against: the outputs existing is all that can be checked
+            return "up to date"
+        with self._lock:
+            recorded = self.state["stages"].get(name)
+        return "up to date" if recorded == self.input_hash(name) else "stale"
+
+    def _finish(self, name):
+        input_hash = self.input_hash(name)
+        with self._lock:
+            self.state["stages"][name] = input_hash
+            self._save_state()
+
+    def _stream_chain(self, head, waiting):
+        # The head transform plus the waiting transforms that consume its output, and theirs
+        chain = [head]
+        while True:
+            output = self.stages[chain[-1]].outputs[0]
+            consumers = [name for name in waiting
+                         if self.stages[name].transform is not None and self.stages[name].inputs == [output]]
+            if len(consumers) != 1:
+                return chain
+            chain.append(consumers[0])
+            waiting.remove(consumers[0])
+
+    def _run_job(self, chain, events, profile=(), profiler=None):
+        done = set()
+        start = time.perf_counter()
+
+        def finished(name):
+            self._finish(name)
+            done.add(name)
+            elapsed = time.perf_counter() - start
+            metrics.observe("stage", elapsed, stage=name)
+            print(f"✅ {name} done ({elapsed:.1f}s)")
+            events.put((name, "ran"))
+
+        def announce(name, records):
+            yield from records
+            finished(name)
+
+        # A streamed chain runs as one job, so it is profiled as a whole
+        label = "+".join(chain)
+        selected = {label} if "all" in profile or set(chain) & set(profile) else ()
+        try:
+            print(f"▶ Running {' → '.join(chain)}")
+            head = self.stages[chain[0]]
+            with profile_stage(label, selected, profiler):
+                if head.transform is None:
+                    head.run()
+                    finished(head.name)
+                else:
+                    records = iter_records(head.inputs[0])
+                    for name in chain:
+                        stage = self.stages[name]
+                        records = announce(name, tee_records(stage.outputs[0], stage.transform(records)))
+                    for _ in records:
+                        pass
+        except Exception:
+            print(f"⚠️ Stage {' → '.join(chain)} failed:")
+            traceback.print_exc()
+            for name in chain:
+                if name not in done:
+                    events.put((name, "failed"))
+        finally:
+            events.put((None, None))
+
+    def run(self, targets=DEFAULT_TARGETS, force=(), jobs=2, profile=None, profiler=None):
+        """
+        Bring `targets` up to date. Returns {stage: 'ran' | 'skipped' | 'failed' | 'blocked'}.
+        Stages in `profile` (default: $SCHOLAR_PROFILE, see metrics.py) are profiled while they run.
+        """
+        profile = profiled_stages() if profile is None else set(profile)
+        waiting = self.plan(targets)
+        unknown = set(force) - set(self.stages)
+        if unknown:
+            raise KeyError(f"Unknown stage(s) to force: {sorted(unknown)}")
+        results = {}
+        events = queue.Queue()
+        running = 0
+        with ThreadPoolExecutor(jobs) as pool:
+            while waiting or running:
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for name in list(waiting):
+                        dependencies = self.dependencies(name)
+                        if any(results.get(d) in ("failed", "blocked") for d in dependencies):
+                            results[name] = "blocked"
+                        elif not all(d in results for d in dependencies):
+                            continue
+                        elif name not in force and self.status(name) == "up to date":
+                            print(f"⏭ {name} is up to date")
+                            results[name] = "skipped"
+                        else:
+                            waiting.remove(name)
+                            chain = self._stream_chain(name, waiting) if self.stages[name].transform else [name]
+                            pool.submit(self._run_job, chain, events, profile, profiler)
+                            running += 1
+                            continue
+                        waiting.remove(name)
+                        progressed = True
+                if not running:
+                    break
+                name, outcome = events.get()
+                if name is None:
+                    running -= 1
+                else:
+                    results[name] = outcome
+        for name in waiting:
+            results[name] = "blocked"
+        return results
+
+
+def build_stages(profile="gpu", backend="torch", workers=1, embedder=None, parquet_file=None):
+    """scrape → dedup → clean → summarize → search/pdf, with export and topics off the deduplicated results."""
+    abstracts_file = PROFILE_FILES[profile]["output_file"]
+
+    def scrape():
+        import scholer
+        scholer.save_results()
+
+    def dedup(records):
+        from removeDuplicates import unique_records
+        semantic_index = None
+        if embedder:
+            # With an embedder, near-identical articles are dropped too (see removeDuplicates.py)
+            from semantic_index import EMBEDDERS, SemanticIndex
+            semantic_index = SemanticIndex(EMBEDDINGS_DIR, EMBEDDERS[embedder]())
+        return unique_records(records, semantic_index)
+
+    def clean(records):
+        from clean import clean_records
+        return clean_records(records)
+
+    def summarize(records):
+        from summarizer import Summarizer, make_worker_pool, summarize_records
+        summarizer = Summarizer(profile, backend)
+        checkpoint = Checkpoint(f"summarize_{profile}_{backend}")
+        if workers > 1:
+            with make_worker_pool(summarizer, workers) as pool:
+                yield from summarize_records(records, summarizer, checkpoint,
+                                             executor=pool, max_in_flight=2 * workers)
+        else:
+            yield from summarize_records(records, summarizer, checkpoint)
+
+    def export():
+        from jsonTocsv import json_to_csv
+        json_to_csv(DEDUP_FILE, CSV_FILE, parquet_file)
+
+    def search():
+        from search_index import SearchIndex
+        index = SearchIndex(SEARCH_INDEX_FILE)
+        index.add_records(iter_records(DEDUP_FILE))
+        index.add_summaries(iter_records(abstracts_file))
+        index.optimize()
+
+    def topics():
+        from semantic_index import EMBEDDERS, SemanticIndex
+        index = SemanticIndex(EMBEDDINGS_DIR, EMBEDDERS[embedder]() if embedder else None)
+        index.add_records(iter_records(DEDUP_FILE))
+        index.cluster()
+
+    def pdf():
+        from json_to_pdf import build_report
+        build_report(abstracts_file, PDF_FILE, CLEAN_FILE, EMBEDDINGS_DIR, FONT_PATH)
+
+    return [
+        # Scholar is the real input of the scrape: it only reruns when forced or when its output is missing
+        Stage("scrape", outputs=[RESULTS_FILE], run=scrape),
+        Stage("dedup", [RESULTS_FILE], [DEDUP_FILE], transform=dedup, params=embedder),
+        Stage("clean", [DEDUP_FILE], [CLEAN_FILE], transform=clean),
+        Stage("summarize", [CLEAN_FILE], [abstracts_file], transform=summarize, params=[profile, backend]),
+        Stage("export", [DEDUP_FILE], [CSV_FILE] + ([parquet_file] if parquet_file else []), run=export),
+        Stage("search", [DEDUP_FILE, abstracts_file], [SEARCH_INDEX_FILE], run=search),
+        Stage("topics", [DEDUP_FILE], [TOPICS_FILE], run=topics, params=embedder),
+        Stage("pdf", [abstracts_file, CLEAN_FILE], [PDF_FILE], run=pdf, optional_inputs=[TOPICS_FILE]),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the scrape → dedup → clean → summarize → export/PDF pipeline.")
+    parser.add_argument("--profile", choices=sorted(PROFILE_FILES), default="gpu", help="summarization profile (see Abstraction/summarizer.py)")
+    parser.add_argument("--backend", default="torch", help="summarization backend")
+    parser.add_argument("--workers", type=int, default=1, help="summarizer worker processes")
+    parser.add_argument("--embedder", help="embedder for semantic dedup and the topics stage (see semantic_index.py)")
+    parser.add_argument("--parquet", help="also export this Parquet file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="bring stages up to date")
+    run.add_argument("targets", nargs="*", default=list(DEFAULT_TARGETS))
+    run.add_argument("--force", nargs="*", default=[], help="stages to rerun even if up to date")
+    run.add_argument("--jobs", type=int, default=2, help="stages run in parallel")
+    run.add_argument("--profile-stages", nargs="*", help="stages to profile, or 'all' (default: $SCHOLAR_PROFILE)")
+    run.add_argument("--profiler", choices=("cprofile", "py-spy"), help="profiler (default: $SCHOLAR_PROFILER or cprofile)")
+    run.add_argument("--metrics", default=METRICS_FILE, help="JSON Lines file the run's metrics are appended to")
+
+    status = commands.add_parser("status", help="show which stages are up to date")
+    status.add_argument("targets", nargs="*", default=list(DEFAULT_TARGETS))
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline(build_stages(args.profile, args.backend, args.workers, args.embedder, args.parquet))
+    if args.command == "status":
+        for name in pipeline.plan(args.targets):
+            print(f"{name:<10} {pipeline.status(name)}")
+        return
+
+    start = time.perf_counter()
+    results = pipeline.run(args.targets, force=args.force, jobs=args.jobs,
+                           profile=args.profile_stages, profiler=args.profiler)
+    print(f"\nPipeline finished in {time.perf_counter() - start:.1f}s")
+    for name, outcome in results.items():
+        print(f"{name:<10} {outcome}")
+    print()
+    print(metrics.summary_table())
+    metrics.export(args.metrics, targets=args.targets, results=results)
+    if any(outcome in ("failed", "blocked") for outcome in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
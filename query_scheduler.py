@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import threading
+
+QUERY_STATE_FILE = "query_state.json"
+
+# Prior for a query's yield (new unique results per result fetched): a query
+# never searched counts as PRIOR_NEW new out of PRIOR_RESULTS, so unexplored
+# queries are tried before proven mediocre ones
+PRIOR_NEW = 1.0
+PRIOR_RESULTS = 2.0
+
+# A query is dropped once at least MIN_RESULTS of its results were seen and its
+# estimated yield fell below MIN_YIELD, when Scholar has nothing more for it, or
+# past MAX_DEPTH results (Scholar stops paging around 1000)
+MIN_RESULTS = 10
+MIN_YIELD = 0.2
+MAX_DEPTH = 200
+
+
+class QueryScheduler:
+    """
+    Decides which Scholar query to page into next, spending a fixed budget of
+    searches per run on the queries that keep returning new papers.
+
+    For each query the state file keeps how deep it was paged (`fetched`),
+    how many of those results were new unique papers (`new`) and whether it
+    was dropped. next_page() hands out the most promising query's next page;
+    a query is never searched again until its previous page was reported
+    back with searched(), so each choice sees the latest yield. A page is
+    only persisted once completed(), i.e. once its results were saved, so an
+    interrupted run searches it again instead of losing it.
+    """
+
+    def __init__(self, queries, path=QUERY_STATE_FILE, page_size=10, budget=None):
+        self.queries = list(dict.fromkeys(queries))
+        self.path = path
+        self.page_size = page_size
+        self.budget = len(self.queries) if budget is None else budget
+        self.state = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        # Live view: persisted pages plus the ones searched in this run
+        self.live = {query: dict(self._entry(query)) for query in self.queries}
+        self.busy = set()
+        self.pages = {}     # (query, start) -> (returned, fresh, exhausted) of pages searched but not completed
+        self.spent = 0
+        self._condition = threading.Condition()
+
+    def _entry(self, query):
+        return self.state.get(query) or {"fetched": 0, "new": 0, "dropped": None}
+
+    def _save(self):
+        # Called with the condition held
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def seed(self, query, fetched, new):
+        """Record a query already searched to depth `fetched` (e.g. by an older run) with `new` new results."""
+        with self._condition:
+            self.state[query] = {"fetched": fetched, "new": new, "dropped": None}
+            self._drop_if_spent(self.state[query])
+            self.live[query] = dict(self.state[query])
+            self._save()
+
+    @staticmethod
+    def estimate(entry):
+        return (entry["new"] + PRIOR_NEW) / (entry["fetched"] + PRIOR_RESULTS)
+
+    def _drop_if_spent(self, entry):
+        if entry["dropped"]:
+            return
+        if entry["fetched"] >= MAX_DEPTH:
+            entry["dropped"] = "max depth"
+        elif entry["fetched"] >= MIN_RESULTS and self.estimate(entry) < MIN_YIELD:
+            entry["dropped"] = "low yield"
+
+    def _candidates(self):
+        return [query for query in self.queries
+                if not self.live[query]["dropped"] and query not in self.busy]
+
+    def next_page(self):
+        """
+        (query, start) of the next page to search, or None once the budget is
+        spent or every query is dropped. Blocks while the only candidates left
+        are waiting for their previous page.
+        """
+        with self._condition:
+            while True:
+                if self.spent >= self.budget:
+                    return None
+                candidates = self._candidates()
+                if candidates:
+                    # Highest estimated yield first; ties keep the list order
+                    query = max(candidates, key=lambda q: (self.estimate(self.live[q]), -self.queries.index(q)))
+                    self.busy.add(query)
+                    self.spent += 1
+                    return query, self.live[query]["fetched"]
+                if not self.busy:
+                    return None
+                self._condition.wait()
+
+    def searched(self, query, start, returned, fresh, failed=False):
+        """
+        Report a page: `returned` results, `fresh` of them not known
+        duplicates. A page that `failed` part way keeps what it returned and
+        leaves the query alone for the rest of the run.
+        """
+        with self._condition:
+            live = self.live[query]
+            live["fetched"] = start + returned
+            live["new"] += fresh
+            exhausted = returned < self.page_size and not failed
+            if failed:
+                live["dropped"] = "failed"
+            elif exhausted:
+                live["dropped"] = "exhausted"
+            self._drop_if_spent(live)
+            self.pages[(query, start)] = (returned, fresh, exhausted)
+            self.busy.discard(query)
+            self._condition.notify_all()
+
+    def completed(self, query, start, saved):
+        """Every result of the page at `start` is written, `saved` of them as new records: persist it."""
+        with self._condition:
+            returned, _, exhausted = self.pages.pop((query, start))
+            entry = dict(self._entry(query))
+            entry["fetched"] = max(entry["fetched"], start + returned)
+            entry["new"] += saved
+            if exhausted:
+                entry["dropped"] = "exhausted"
+            self._drop_if_spent(entry)
+            self.state[query] = entry
+            # The live yield used fresh counts; correct it with what was really saved
+            live = self.live.get(query)
+            if live is not None:
+                live["new"] = entry["new"] + sum(page[1] for (q, _), page in self.pages.items() if q == query)
+            self._save()
+
+    def report(self, limit=10):
+        """Lines on the most and least productive queries, for the end of a run."""
+        rows = sorted(((self.estimate(self.live[q]), q) for q in self.queries), reverse=True)
+        lines = [f"Scholar searches this run: {self.spent}/{self.budget}"]
+        for estimate, query in rows[:limit]:
+            entry = self.live[query]
+            status = f" (dropped: {entry['dropped']})" if entry["dropped"] else ""
+            lines.append(f"  {estimate:5.0%}  {entry['new']:>4} new / {entry['fetched']:>4}  {query}{status}")
+        dropped = sum(1 for q in self.queries if self.live[q]["dropped"])
+        lines.append(f"{dropped} of {len(self.queries)} queries dropped")
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or reset the per-query yield the scraper schedules by.")
+    parser.add_argument("--state", default=QUERY_STATE_FILE)
+    parser.add_argument("--reset", nargs="*", metavar="QUERY",
+                        help="forget these queries (all if none given) so they are searched from the start")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.state):
+        print(f"No query state in {args.state}")
+        return
+    with open(args.state, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if args.reset is not None:
+        for query in args.reset or list(state):
+            state.pop(query, None)
+        with open(args.state, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1, ensure_ascii=False)
+        print(f"✅ {len(state)} queries left in {args.state}")
+        return
+    for query, entry in sorted(state.items(), key=lambda item: -QueryScheduler.estimate(item[1])):
+        status = f" (dropped: {entry['dropped']})" if entry["dropped"] else ""
+        print(f"{QueryScheduler.estimate(entry):5.0%}  {entry['new']:>4} new / {entry['fetched']:>4}  {query}{status}")
+
+
+if __name__ == "__main__":
+    main()
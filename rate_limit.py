@@ -0,0 +1,63 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available and take them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def host_of(url_or_host):
+    if "://" in url_or_host:
+        return (urlsplit(url_or_host).hostname or "").lower()
+    return url_or_host.lower()
+
+
+class HostRateLimiter:
+    """
+    One token bucket per host, shared by every thread.
+
+    `rates` maps a host to a (rate, capacity) pair; any other host gets
+    (`default_rate`, `default_capacity`).
+    """
+
+    def __init__(self, default_rate=1.0, default_capacity=1, rates=None):
+        self.default_rate = default_rate
+        self.default_capacity = default_capacity
+        self.rates = {host.lower(): limits for host, limits in (rates or {}).items()}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url_or_host):
+        host = host_of(url_or_host)
+        with self._lock:
+            if host not in self._buckets:
+                rate, capacity = self.rates.get(host, (self.default_rate, self.default_capacity))
+                self._buckets[host] = TokenBucket(rate, capacity)
+            return self._buckets[host]
+
+    def wait(self, url_or_host):
+        """Block until a request to this host is allowed."""
+        self.bucket(url_or_host).acquire()
@@ -1,32 +1,79 @@
-import json
-
-# Load data from JSON file
-def load_json(filename):
-    with open(filename, "r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
-
-# Save cleaned data back to JSON
-def save_json(filename, data):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-
-# Remove duplicates based on title field
-def remove_duplicates(filename):
-    data = load_json(filename)
-    unique_titles = set()
-    cleaned_data = []
-
-    for entry in data:
-        title = entry.get("title", "").strip().lower()
-        if title and title not in unique_titles:
-            unique_titles.add(title)
-            cleaned_data.append(entry)
-
-    save_json(filename, cleaned_data)
-    print(f"✅ Removed duplicates! Updated data saved in {filename}")
-
-# Run the function on your JSON file
-remove_duplicates("test.json")
+import argparse
+
+from checkpoint import record_key
+from dedup_index import DedupIndex
+from result_store import iter_records, write_records
+
+# Records embedded per semantic index update when semantic dedup is on
+SEMANTIC_BATCH_SIZE = 64
+
+# Remove duplicates: same DOI/URL/title, or near-identical title and abstract
+def unique_records(records, semantic_index=None, batch_size=SEMANTIC_BATCH_SIZE):
+    """
+    Yields the first record of each duplicate group, dropping records without a title.
+    With a semantic_index.SemanticIndex, records whose embedding nearly matches a kept one of the same topic are dropped too;
+    they are embedded `batch_size` at a time as they stream through.
+    """
+    dedup = DedupIndex(path=None)
+    kept_keys = set()
+    batch = []
+
+    def semantic_unique():
+        semantic_index.add_records(batch)
+        for entry in batch:
+            key = record_key(entry)
+            if semantic_index.duplicate_of(key, kept_keys):
+                continue
+            kept_keys.add(key)
+            yield entry
+        batch.clear()
+
+    for entry in records:
+        if not entry.get("title", "").strip():
+            continue
+        _, is_duplicate = dedup.check_and_add(entry)
+        if is_duplicate:
+            continue
+        if semantic_index is None:
+            yield entry
+            continue
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield from semantic_unique()
+    if batch:
+        yield from semantic_unique()
+
+def remove_duplicates(filename, output_file=None, semantic_index=None):
+    """Streams `filename` and writes its unique records to `output_file` (defaults to in place)."""
+    output_file = output_file or filename
+    kept = 0
+
+    def counted():
+        nonlocal kept
+        for entry in unique_records(iter_records(filename), semantic_index):
+            kept += 1
+            yield entry
+
+    write_records(output_file, counted())
+    print(f"✅ Removed duplicates! {kept} unique records saved in {output_file}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remove duplicate scholar results.")
+    parser.add_argument("input", nargs="?", default="scholar_results.jsonl")
+    parser.add_argument("--output", help="file to write (default: rewrite the input)")
+    parser.add_argument("--embeddings", help="semantic index directory; also drops articles whose embeddings nearly match")
+    parser.add_argument("--embedder", help="embedding backend for --embeddings (see semantic_index.py; default: the index's)")
+    args = parser.parse_args(argv)
+
+    semantic_index = None
+    if args.embeddings or args.embedder:
+        # numpy and the embedding model are only loaded when semantic dedup is asked for
+        from semantic_index import EMBEDDERS, EMBEDDINGS_DIR, SemanticIndex
+        if args.embedder and args.embedder not in EMBEDDERS:
+            parser.error(f"unknown embedder '{args.embedder}', expected one of {sorted(EMBEDDERS)}")
+        semantic_index = SemanticIndex(args.embeddings or EMBEDDINGS_DIR,
+                                       EMBEDDERS[args.embedder]() if args.embedder else None)
+    remove_duplicates(args.input, args.output, semantic_index)
+
+if __name__ == "__main__":
+    main()
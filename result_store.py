@@ -0,0 +1,218 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import threading
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+READ_CHUNK_SIZE = 1 << 20
+
+_append_lock = threading.Lock()
+
+
+def _compression(path):
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path}: install 'zstandard' to read or write .zst files")
+        return "zstd"
+    return None
+
+
+def _compress(data, compression):
+    if compression == "gzip":
+        return gzip.compress(data)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def _open_binary_reader(path):
+    compression = _compression(path)
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True)
+    return open(path, "rb")
+
+
+def _encode(records):
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+
+def append_records(path, records):
+    """
+    Append records as JSON lines in a single write, fsync'd before returning.
+
+    Compressed stores get one gzip member / zstd frame per call; both formats
+    read back concatenated members as a single stream.
+    """
+    data = _encode(records)
+    if not data:
+        return
+    data = _compress(data, _compression(path))
+    with _append_lock:
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def append_record(path, record):
+    """Append a single record to a JSON Lines store."""
+    append_records(path, [record])
+
+
+def tee_records(path, records):
+    """
+    Yield `records` while writing them to `path`, so a downstream stage can
+    consume them as they are produced. The store at `path` is replaced
+    atomically once the records are exhausted; if the stream is abandoned
+    or fails, it is left untouched.
+    """
+    tmp_path = path + ".tmp"
+    compression = _compression(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            # Records are encoded before they are yielded, so a consumer that
+            # mutates them cannot change what is written
+            batch = []
+            for record in records:
+                batch.append(_encode([record]))
+                if len(batch) >= 1000:
+                    f.write(_compress(b"".join(batch), compression))
+                    batch = []
+                yield record
+            f.write(_compress(b"".join(batch), compression))
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def write_records(path, records):
+    """Replace the store at `path` with `records`, atomically."""
+    for _ in tee_records(path, records):
+        pass
+
+
+def _iter_json_lines(stream, path):
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            # A crash mid-append can only truncate the final line
+            print(f"⚠️ Skipping unreadable record at {path}:{line_no}")
+
+
+def _iter_legacy_json(stream, path):
+    """
+    Stream objects out of a JSON array, or out of the legacy
+    `{...},\\n{...},\\n` files written by the old append-mode scraper.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    while True:
+        # Skip array brackets, separators and whitespace between objects
+        buffer = buffer.lstrip(" \t\r\n[],")
+        if not buffer:
+            if eof:
+                return
+            chunk = stream.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        try:
+            record, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                print(f"⚠️ Ignoring truncated trailing data in {path}")
+                return
+            chunk = stream.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield record
+        buffer = buffer[end:]
+
+
+def iter_records(path):
+    """
+    Yield the records of a result store one at a time.
+
+    Reads JSON Lines (optionally .gz/.zst compressed) as well as legacy JSON
+    array / append-mode files, so every stage can stream either format.
+    """
+    if not os.path.exists(path):
+        return
+    with _open_binary_reader(path) as raw:
+        stream = io.TextIOWrapper(raw, encoding="utf-8")
+        head = stream.read(1)
+        while head and head.isspace():
+            head = stream.read(1)
+        if not head:
+            return
+        if head == "[" or path.endswith(".json"):
+            yield from _iter_legacy_json(_Prepend(head, stream), path)
+        else:
+            yield from _iter_json_lines(_Prepend(head, stream), path)
+
+
+class _Prepend:
+    """Text stream with an already-consumed prefix pushed back in front."""
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        prefix, self.prefix = self.prefix, ""
+        return prefix + self.stream.read(size if size < 0 else max(size - len(prefix), 0))
+
+    def __iter__(self):
+        first = self.prefix + self.stream.readline()
+        self.prefix = ""
+        if first:
+            yield first
+        yield from self.stream
+
+
+def compact(src, dst):
+    """Rewrite any result store (including legacy JSON) as clean JSON Lines."""
+    count = 0
+
+    def counted():
+        nonlocal count
+        for record in iter_records(src):
+            count += 1
+            yield record
+
+    write_records(dst, counted())
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate or compact a scholar results store.")
+    parser.add_argument("src", help="existing store (.json legacy, .jsonl, .jsonl.gz, .jsonl.zst)")
+    parser.add_argument("dst", help="JSON Lines file to write (compression picked from the extension)")
+    args = parser.parse_args()
+
+    count = compact(args.src, args.dst)
+    print(f"✅ Wrote {count} records to {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
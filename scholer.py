@@ -1,13 +1,22 @@
-import json
-import time
+import argparse
 import os
-import requests
-from scholarly import scholarly
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from driver_pool import DriverPool
+from html_cache import HtmlCache
+from rate_limit import HostRateLimiter
+from result_store import append_record, compact, iter_records
+from checkpoint import Checkpoint, content_hash
+from dedup_index import DedupIndex
+from search_index import SearchIndex
+from query_scheduler import QueryScheduler
+from metrics import metrics
+from extractors import content_tree, extract_article
+from blob_store import externalize_record
 
 # List of expanded search queries
 queries = [
@@ -59,157 +68,456 @@ queries = [
     "How to incorporate exercise snacking into daily life?"
 ]
 
-# File to store results
-RESULTS_FILE = "scholar_results.json"
+# File to store results (JSON Lines; add .gz or .zst to compress), and the
+# legacy JSON file migrated into it on first run
+RESULTS_FILE = "scholar_results.jsonl"
+LEGACY_RESULTS_FILE = "scholar_results.json"
+
+# Scholar results requested per search (a Scholar results page holds 10), and
+# searches per run, spent by the query scheduler on the queries still yielding
+# new papers (None: one per query); see query_scheduler.py
+MAX_RESULTS_PER_QUERY = 5
+SEARCH_BUDGET = None
+QUERY_STATE_FILE = "query_state.json"
+
+# Number of long-lived browsers shared by all page fetches, and how many pages
+# each one serves before it is restarted
+DRIVER_POOL_SIZE = 2
+DRIVER_MAX_PAGES = 50
+
+# Persistent HTML cache: pages are refetched after HTML_CACHE_TTL seconds and the
+# oldest pages are evicted past HTML_CACHE_MAX_BYTES (None disables either limit)
+HTML_CACHE_DIR = "html_cache"
+HTML_CACHE_TTL = 30 * 24 * 3600
+HTML_CACHE_MAX_BYTES = 2 * 1024 ** 3
+HTML_CACHE_COMPRESS = True
+
+# Opened on first fetch, so importing this module creates nothing on disk
+_html_cache = None
+_shared_lock = threading.Lock()
+
+def get_html_cache():
+    global _html_cache
+    with _shared_lock:
+        if _html_cache is None:
+            _html_cache = HtmlCache(HTML_CACHE_DIR, ttl=HTML_CACHE_TTL,
+                                    max_bytes=HTML_CACHE_MAX_BYTES, compress=HTML_CACHE_COMPRESS)
+        return _html_cache
+
+# Concurrency of save_results: query producers, page fetchers and HTML parsers,
+# plus the number of fetch jobs allowed to wait between them
+SEARCH_WORKERS = 2
+FETCH_WORKERS = 4
+PARSE_WORKERS = 2
+FETCH_QUEUE_SIZE = 20
+
+# Requests per second (and burst size) per host; Scholar is kept well below
+# the rate that gets us blocked, publisher sites share a more relaxed default
+SCHOLAR_HOST = "scholar.google.com"
+rate_limiter = HostRateLimiter(default_rate=1.0, default_capacity=2,
+                               rates={SCHOLAR_HOST: (0.2, 1)})
+
+# Abstract/DOI nodes and citation meta tags read by the extractors (see
+# extractors.py). A static page containing one of them is used as is; otherwise
+# the browser waits (up to PAGE_LOAD_TIMEOUT seconds) for one to appear.
+CONTENT_SELECTOR = ("div.abstract-content, section.abstract, a[href*='doi.org'], "
+                    "meta[name='citation_doi'], meta[name='citation_abstract']")
+PAGE_LOAD_TIMEOUT = 10
+STATIC_FETCH_TIMEOUT = 15
 
-# Ensure the directory for HTML caching exists
-os.makedirs("html_cache", exist_ok=True)
+# Pooled HTTP session for the static tier, created (and requests imported) on first use
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/122.0 Safari/537.36")
+_http_session = None
+
+def get_http_session():
+    global _http_session
+    with _shared_lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+            session.mount("https://", HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS))
+            session.mount("http://", HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS))
+            _http_session = session
+        return _http_session
+
+# Counts pages by how they were obtained (fetch.pages{tier=cache|static|browser|failed})
+# and times each tier per host; see metrics.py
+def count_fetch(tier):
+    metrics.count("fetch.pages", tier=tier)
+
+def report_fetch_stats():
+    """Prints per-tier page counts and the browser time avoided by the cheaper tiers."""
+    pages = {tier: metrics.total("fetch.pages", tier=tier) for tier in ("cache", "static", "browser", "failed")}
+    browser_seconds = metrics.seconds("fetch.browser")
+    avg_browser = browser_seconds / pages["browser"] if pages["browser"] else 0.0
+    avoided = (pages["cache"] + pages["static"]) * avg_browser
+    print(f"Pages by tier: cache={pages['cache']}, static={pages['static']}, "
+          f"browser={pages['browser']}, failed={pages['failed']}")
+    print(f"Browser time: {browser_seconds:.1f}s "
+          f"(avg {avg_browser:.1f}s/page, ~{avoided:.0f}s avoided)")
+
+# Near-duplicate index consulted before any page is fetched
+DEDUP_INDEX_FILE = "dedup_index.jsonl"
+
+# Full-text search index, updated as results are saved (see search_index.py)
+SEARCH_INDEX_FILE = "search_index.sqlite"
 
 # Load existing results to avoid duplicates
 def load_existing_results():
-    if os.path.exists(RESULTS_FILE):
-        with open(RESULTS_FILE, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
-
-# Save a single result to the JSON file
+    """Streams previously saved results, migrating the legacy JSON file if needed."""
+    if not os.path.exists(RESULTS_FILE) and os.path.exists(LEGACY_RESULTS_FILE):
+        count = compact(LEGACY_RESULTS_FILE, RESULTS_FILE)
+        print(f"Migrated {count} results from {LEGACY_RESULTS_FILE} to {RESULTS_FILE}")
+    return iter_records(RESULTS_FILE)
+
+# Open the dedup index, seeding it from the saved results on first use
+def load_dedup_index():
+    dedup = DedupIndex(DEDUP_INDEX_FILE)
+    if not len(dedup):
+        for result in load_existing_results():
+            dedup.check_and_add(result)
+        print(f"Indexed {len(dedup)} existing results for deduplication")
+    return dedup
+
+# Open the search index, indexing the saved results on first use
+def load_search_index():
+    index = SearchIndex(SEARCH_INDEX_FILE)
+    if not len(index):
+        index.add_records(load_existing_results())
+    return index
+
+# Open the query scheduler, carrying over the queries an older run checkpointed as done
+def load_query_scheduler(query_list, budget=SEARCH_BUDGET):
+    scheduler = QueryScheduler(query_list, QUERY_STATE_FILE, page_size=MAX_RESULTS_PER_QUERY, budget=budget)
+    if not scheduler.state:
+        checkpoint = Checkpoint("scrape")
+        for query in query_list:
+            done = checkpoint.get(query, content_hash([query, MAX_RESULTS_PER_QUERY]))
+            if done is not None:
+                scheduler.seed(query, MAX_RESULTS_PER_QUERY, done["new_results"])
+    return scheduler
+
+# Save a single result to the results store
 def save_result_to_file(result):
-    """Append a new result to the JSON file without loading the full dataset into memory."""
-    with open(RESULTS_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(result, indent=4, ensure_ascii=False) + ",\n")
+    """
+    Append a new result as one fsync'd JSON line without loading the full dataset into memory.
+    Its page text goes to the blob store; the line only keeps a reference.
+    """
+    append_record(RESULTS_FILE, externalize_record(result))
 
 # Setup Selenium WebDriver
+_chromedriver_path = None
+
 def setup_driver(headless=True):
+    global _chromedriver_path
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from webdriver_manager.chrome import ChromeDriverManager
+    if _chromedriver_path is None:
+        _chromedriver_path = ChromeDriverManager().install()
     options = Options()
     options.headless = headless
     options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver = webdriver.Chrome(service=Service(_chromedriver_path), options=options)
     return driver
 
-# Fetch and store HTML before scraping
-def fetch_html(url):
-    """Fetches HTML from a webpage and stores it locally."""
-    try:
-        driver = setup_driver()
+# Pool of browsers borrowed by fetch_html; browsers only start when a page needs one
+def make_driver_pool():
+    return DriverPool(setup_driver, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES)
+
+_driver_pool = None
+
+def get_driver_pool():
+    """The pool shared by fetch_html callers that don't pass their own."""
+    global _driver_pool
+    with _shared_lock:
+        if _driver_pool is None:
+            _driver_pool = make_driver_pool()
+        return _driver_pool
+
+# Fast tier: plain HTTP request, no JavaScript
+def fetch_static_html(url):
+    """
+    Returns (html, status, parsed tree) when the static page has the
+    abstract/DOI, else (None, status, None). The tree is reused for parsing.
+    """
+    response = get_http_session().get(url, timeout=STATIC_FETCH_TIMEOUT)
+    if response.status_code != 200 or "html" not in response.headers.get("Content-Type", ""):
+        return None, response.status_code, None
+    tree = content_tree(response.text)
+    if tree is None:
+        return None, response.status_code, None
+    return response.text, response.status_code, tree
+
+# Slow tier: full browser, waiting for the content instead of a fixed delay
+def fetch_browser_html(url, pool):
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    with pool.borrow() as driver:
         driver.get(url)
-        time.sleep(3)  # Allow JavaScript to load content
-        html_content = driver.page_source
-        driver.quit()
-
-        filename = f"html_cache/{hash(url)}.html"
-        with open(filename, "w", encoding="utf-8") as file:
-            file.write(html_content)
-        return filename
-    except Exception as e:
-        print(f"⚠️ Error fetching HTML for {url}: {e}")
-        return None
+        try:
+            WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(
+                lambda d: d.find_elements(By.CSS_SELECTOR, CONTENT_SELECTOR)
+            )
+        except TimeoutException:
+            pass  # Not every page has an abstract/DOI; take what has rendered
+        return driver.page_source
 
-# Extract research paper details after saving HTML
-def fetch_full_content(url):
-    """Extracts structured content from stored HTML."""
-    html_file = fetch_html(url)
-    if not html_file:
-        return {"Error": "HTML not available"}
+# Fetch and store HTML before scraping
+def fetch_html(url, pool=None, cache=None):
+    """
+    Returns the HTML of a webpage, trying the local cache, then a plain HTTP
+    request, and only then a pooled browser.
+    """
+    return fetch_page(url, pool=pool, cache=cache)[0]
 
-    try:
-        with open(html_file, "r", encoding="utf-8") as file:
-            soup = BeautifulSoup(file, "html.parser")
-
-        article_data = {
-            "Title": "No Title Found",
-            "Authors": "No Authors Found",
-            "Abstract": "No Abstract Found",
-            "DOI": "No DOI Found",
-            "Keywords": "No Keywords Found",
-            "Full Text Content": "No Full Text Available"
-        }
+def fetch_page(url, pool=None, cache=None):
+    """
+    Like fetch_html, but returns (html, tree): the page parsed while checking
+    a static fetch for content, else None, so it isn't parsed twice.
+    """
+    pool = pool or get_driver_pool()
+    cache = cache or get_html_cache()
+    host = urlparse(url).hostname or ""
 
-        title_tag = soup.find("h1") or soup.find("h2")
-        if title_tag:
-            article_data["Title"] = title_tag.get_text(strip=True)
+    html_content = cache.get(url)
+    if html_content is not None:
+        count_fetch("cache")
+        return html_content, None
 
-        author_tag = soup.find("div", class_="authors") or soup.find("span", class_="authors")
-        if author_tag:
-            article_data["Authors"] = author_tag.get_text(strip=True)
+    try:
+        rate_limiter.wait(url)
+        with metrics.timer("fetch.static", host=host):
+            html_content, status, tree = fetch_static_html(url)
+        if html_content is not None:
+            cache.put(url, html_content, status=status)
+            count_fetch("static")
+            return html_content, tree
+    except Exception as e:
+        print(f"⚠️ Static fetch failed for {url}: {e}")
 
-        abstract_tag = soup.find("div", class_="abstract-content") or soup.find("section", class_="abstract")
-        if abstract_tag:
-            article_data["Abstract"] = abstract_tag.get_text(separator=" ", strip=True)
+    try:
+        rate_limiter.wait(url)
+        with metrics.timer("fetch.browser", host=host):
+            html_content = fetch_browser_html(url, pool)
+        count_fetch("browser")
 
-        doi_tag = soup.find("a", href=lambda x: x and "doi.org" in x)
-        if doi_tag:
-            article_data["DOI"] = doi_tag["href"]
+        cache.put(url, html_content)
+        return html_content, None
+    except Exception as e:
+        count_fetch("failed")
+        print(f"⚠️ Error fetching HTML for {url}: {e}")
+        return None, None
 
-        keyword_section = soup.find("section", class_="keywords") or soup.find("p", class_="keywords")
-        if keyword_section:
-            article_data["Keywords"] = keyword_section.get_text(strip=True).replace("Keywords:", "")
+# Extract research paper details after saving HTML
+def fetch_full_content(url, pool=None, cache=None):
+    """Extracts structured content from cached HTML."""
+    html_content, tree = fetch_page(url, pool=pool, cache=cache)
+    return parse_full_content(html_content, url, tree=tree)
 
-        full_text_section = soup.find("div", class_="full-text") or soup.find("article")
-        if full_text_section:
-            article_data["Full Text Content"] = full_text_section.get_text(separator=" ", strip=True)
-        else:
-            for tag in soup(["script", "style", "nav", "footer", "aside", "form", "header"]):
-                tag.extract()
-            article_data["Full Text Content"] = soup.get_text(separator=" ", strip=True)[:10000]
+# Parse research paper details out of a page
+def parse_full_content(html_content, url, tree=None):
+    """Extracts structured content from HTML already fetched for `url` (or its parsed `tree`)."""
+    if not html_content:
+        return {"Error": "HTML not available"}
 
-        return article_data
+    try:
+        with metrics.timer("parse"):
+            article_data, extractor = extract_article(html_content, url, tree=tree)
     except Exception as e:
         print(f"⚠️ Failed to scrape {url}: {e}")
         return {"Error": "Content not available"}
+    metrics.count("parse.pages", extractor=extractor)
+    if article_data["Abstract"] == "No Abstract Found":
+        metrics.count("parse.no_abstract", extractor=extractor)
+    return article_data
 
-# Fetch Google Scholar results
-def fetch_scholar_results(query, max_results=5):
-    """Fetches top Google Scholar results and extracts content."""
-    results = []
-    search_query = scholarly.search_pubs(query)
+# Search Google Scholar without visiting the paper pages
+def search_scholar(query, max_results=5, start=0):
+    """Yields the top Google Scholar results for a query (from rank `start`) as result dicts."""
+    from scholarly import scholarly
+    rate_limiter.wait(SCHOLAR_HOST)
+    with metrics.timer("scholar.search"):
+        search_query = scholarly.search_pubs(query, start_index=start)
 
     for _ in range(max_results):
         try:
-            article = next(search_query)
-            paper_link = article.get("pub_url", "")
-
-            result = {
-                "title": article['bib'].get('title', 'N/A'),
-                "author": article['bib'].get('author', 'N/A'),
-                "publication_year": article['bib'].get('pub_year', 'N/A'),
-                "abstract": article['bib'].get('abstract', 'N/A'),
-                "citation_count": article.get('num_citations', 'N/A'),
-                "link": paper_link
-            }
-
-            if paper_link:
-                print(f"Scraping full abstract for: {paper_link}")
-                full_abstract = fetch_full_content(paper_link)
-                result["full_abstract"] = full_abstract
-
-            results.append(result)
+            with metrics.timer("scholar.search"):
+                article = next(search_query)
         except StopIteration:
             break
 
+        yield {
+            "title": article['bib'].get('title', 'N/A'),
+            "author": article['bib'].get('author', 'N/A'),
+            "publication_year": article['bib'].get('pub_year', 'N/A'),
+            "abstract": article['bib'].get('abstract', 'N/A'),
+            "citation_count": article.get('num_citations', 'N/A'),
+            "link": article.get("pub_url", "")
+        }
+
+# Fetch Google Scholar results
+def fetch_scholar_results(query, max_results=5):
+    """Fetches top Google Scholar results and extracts content."""
+    results = []
+    for result in search_scholar(query, max_results=max_results):
+        paper_link = result["link"]
+        if paper_link:
+            print(f"Scraping full abstract for: {paper_link}")
+            result["full_abstract"] = fetch_full_content(paper_link)
+        results.append(result)
+
     return results
 
 # Save new results while avoiding duplicates
-def save_results():
-    """Fetch results for all queries and save without duplicates."""
-    existing_results = load_existing_results()
-    seen_titles = {r.get("title", "").lower() for r in existing_results}
-
-    for query in queries:
-        print(f"Fetching Google Scholar results for: {query}")
-        results = fetch_scholar_results(query)
-
-        for result in results:
-            title = result.get("title", "").lower()
-            if title not in seen_titles:
-                seen_titles.add(title)
+def save_results(query_list=None, budget=SEARCH_BUDGET):
+    """
+    Fetch results for the queries and save without duplicates.
+
+    The query scheduler hands out `budget` Scholar searches, each one page
+    deeper into the query with the best yield of new papers so far, and drops
+    the queries that stopped producing any. Searches feed a bounded queue of
+    page fetch jobs consumed by FETCH_WORKERS threads; parsing runs on a
+    separate pool so it overlaps with page loads, and a single writer thread
+    appends finished results. A search page is recorded once all of its
+    results are written, so a rerun repeats what an interrupted run left
+    unfinished and continues deeper otherwise. Near-duplicates (same DOI/URL,
+    or similar title and abstract) are dropped before their page is fetched,
+    or once the fetched page reveals a known DOI. New results are claimed in
+    the dedup index in memory and only persisted once saved.
+    """
+    query_list = query_list or queries
+    dedup = load_dedup_index()
+    search_index = load_search_index()
+    scheduler = load_query_scheduler(query_list, budget)
+    driver_pool = make_driver_pool()
+    progress_lock = threading.Lock()
+
+    pending = Counter()
+    searched = set()
+    saved = Counter()
+
+    def finish_page(page):
+        # Called with progress_lock held
+        if page in searched and pending[page] == 0:
+            scheduler.completed(*page, saved[page])
+
+    stop = object()
+    fetch_jobs = queue.Queue(maxsize=FETCH_QUEUE_SIZE)
+    finished = queue.Queue()
+
+    def search(query, start):
+        page = (query, start)
+        print(f"Fetching Google Scholar results for: {query} (from result {start + 1})")
+        returned = fresh = 0
+        failed = False
+        try:
+            for result in search_scholar(query, max_results=MAX_RESULTS_PER_QUERY, start=start):
+                returned += 1
+                record_id, is_duplicate = dedup.check_and_add(result, persist=False)
+                if is_duplicate:
+                    continue
+                fresh += 1
+                with progress_lock:
+                    pending[page] += 1
+                fetch_jobs.put((page, record_id, result))
+        except Exception as e:
+            print(f"⚠️ Search failed for '{query}': {e}")
+            failed = True
+        scheduler.searched(query, start, returned, fresh, failed=failed)
+        with progress_lock:
+            searched.add(page)
+            finish_page(page)
+
+    def produce():
+        while True:
+            page = scheduler.next_page()
+            if page is None:
+                return
+            search(*page)
+
+    def parse(page, record_id, result, html_content, tree):
+        result["full_abstract"] = parse_full_content(html_content, result["link"], tree=tree)
+        finished.put((page, record_id, result))
+
+    def fetch(parse_pool):
+        while True:
+            job = fetch_jobs.get()
+            if job is stop:
+                break
+            page, record_id, result = job
+            paper_link = result["link"]
+            if not paper_link:
+                finished.put(job)
+                continue
+            print(f"Scraping full abstract for: {paper_link}")
+            html_content, tree = fetch_page(paper_link, pool=driver_pool)
+            parse_pool.submit(parse, page, record_id, result, html_content, tree)
+
+    def write():
+        while True:
+            job = finished.get()
+            if job is stop:
+                break
+            page, record_id, result = job
+            original = dedup.update(record_id, result)
+            if original is None:
                 save_result_to_file(result)
+                search_index.add_record(result)
+            else:
+                print(f"Skipping duplicate of '{original}': {result.get('title')}")
+            with progress_lock:
+                pending[page] -= 1
+                saved[page] += original is None
+                finish_page(page)
+
+    writer = threading.Thread(target=write, daemon=True)
+    writer.start()
+    try:
+        with ThreadPoolExecutor(PARSE_WORKERS) as parse_pool:
+            fetchers = [threading.Thread(target=fetch, args=(parse_pool,), daemon=True)
+                        for _ in range(FETCH_WORKERS)]
+            for fetcher in fetchers:
+                fetcher.start()
+
+            producers = [threading.Thread(target=produce, daemon=True) for _ in range(SEARCH_WORKERS)]
+            for producer in producers:
+                producer.start()
+            for producer in producers:
+                producer.join()
 
-        time.sleep(5)  # Prevent blocking
+            for _ in fetchers:
+                fetch_jobs.put(stop)
+            for fetcher in fetchers:
+                fetcher.join()
+    finally:
+        finished.put(stop)
+        writer.join()
+        driver_pool.close()
+        if _html_cache is not None:
+            _html_cache.flush()
 
     print(f"✅ Data collection complete! Results saved in {RESULTS_FILE}")
+    report_fetch_stats()
+    print(scheduler.report())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search Google Scholar and save the articles found, with their pages.")
+    parser.add_argument("--budget", type=int, default=SEARCH_BUDGET,
+                        help="Scholar searches this run (default: one per query)")
+    parser.add_argument("--query", action="append", dest="queries", metavar="QUERY",
+                        help="search these queries instead of the built-in list (repeatable)")
+    args = parser.parse_args(argv)
+
+    save_results(args.queries, budget=args.budget)
+    print(metrics.summary_table())
+    metrics.export()
 
 # Run the process
-save_results()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import re
+import sqlite3
+import threading
+import time
+
+from checkpoint import content_hash, record_key
+from result_store import iter_records
+from blob_store import load_text
+
+SEARCH_INDEX_PATH = "search_index.sqlite"
+
+# Indexed text columns and their BM25 weights: a hit in the title counts ten times one in the full text
+FTS_COLUMNS = ("title", "abstract", "keywords", "full_text", "summary")
+BM25_WEIGHTS = (10.0, 3.0, 5.0, 1.0, 2.0)
+
+# Placeholders the scraper stores when a field wasn't found
+MISSING_VALUES = {"", "N/A", "No Abstract Found", "No Keywords Found", "No Authors Found", "No Title Found"}
+
+# Records written per transaction when indexing a whole file
+COMMIT_EVERY = 500
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _text(value):
+    if not isinstance(value, str) or value.strip() in MISSING_VALUES:
+        return ""
+    return value
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def match_query(text):
+    """FTS5 query matching every word of `text` (prefix match on the last one), with no operator syntax."""
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    Full-text index of scraped articles and their generated summaries, in
+    SQLite FTS5.
+
+    `articles` holds one row per record key (normalized title) with the
+    filterable metadata; `articles_fts` holds the searchable text under the
+    same rowid. Records and summaries may arrive in any order and are
+    re-indexed only when their content changed.
+    """
+
+    def __init__(self, path=SEARCH_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, title TEXT, authors TEXT,"
+            " year INTEGER, citations INTEGER, link TEXT, record_hash TEXT, summary TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS articles_year ON articles(year)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS articles_citations ON articles(citations)")
+        exists = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'").fetchone()
+        if not exists:
+            self._db.execute(
+                f"CREATE VIRTUAL TABLE articles_fts USING fts5({', '.join(FTS_COLUMNS)},"
+                " tokenize = 'porter unicode61 remove_diacritics 2')"
+            )
+            weights = ", ".join(map(str, BM25_WEIGHTS))
+            self._db.execute("INSERT INTO articles_fts(articles_fts, rank) VALUES ('rank', ?)",
+                             (f"bm25({weights})",))
+        self._db.commit()
+
+    def _upsert_text(self, row_id, values):
+        self._db.execute("DELETE FROM articles_fts WHERE rowid = ?", (row_id,))
+        self._db.execute(
+            f"INSERT INTO articles_fts (rowid, {', '.join(FTS_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+            (row_id, *(values[column] for column in FTS_COLUMNS)),
+        )
+
+    def _add_record(self, record):
+        key = record_key(record)
+        if not key:
+            return False
+        full = record.get("full_abstract") or {}
+        abstract = " ".join(filter(None, (_text(record.get("abstract")), _text(full.get("Abstract")))))
+        values = {
+            "title": record.get("title", ""),
+            "abstract": abstract,
+            "keywords": _text(full.get("Keywords")),
+            "full_text": _text(load_text(full.get("Full Text Content"))),
+        }
+        authors = record.get("author")
+        if isinstance(authors, list):
+            authors = ", ".join(authors)
+        record_hash = content_hash([values, authors, record.get("publication_year"),
+                                    record.get("citation_count"), record.get("link")])
+
+        row = self._db.execute("SELECT id, record_hash, summary FROM articles WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[1] == record_hash:
+            return False
+        metadata = (values["title"], authors, _to_int(record.get("publication_year")),
+                    _to_int(record.get("citation_count")), record.get("link"), record_hash)
+        if row is None:
+            row_id = self._db.execute(
+                "INSERT INTO articles (key, title, authors, year, citations, link, record_hash)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", (key, *metadata)).lastrowid
+            values["summary"] = ""
+        else:
+            row_id = row[0]
+            self._db.execute(
+                "UPDATE articles SET title = ?, authors = ?, year = ?, citations = ?, link = ?,"
+                " record_hash = ? WHERE id = ?", (*metadata, row_id))
+            values["summary"] = row[2] or ""
+        self._upsert_text(row_id, values)
+        return True
+
+    def _add_summary(self, title, summary):
+        key = title.strip().lower()
+        if not key:
+            return False
+        row = self._db.execute("SELECT id, summary FROM articles WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[1] == summary:
+            return False
+        if row is None:
+            # Summary ahead of its record: index the title too so it is searchable meanwhile
+            row_id = self._db.execute("INSERT INTO articles (key, title, summary) VALUES (?, ?, ?)",
+                                      (key, title, summary)).lastrowid
+            self._upsert_text(row_id, {"title": title, "abstract": "", "keywords": "",
+                                       "full_text": "", "summary": summary})
+        else:
+            self._db.execute("UPDATE articles SET summary = ? WHERE id = ?", (summary, row[0]))
+            self._db.execute("UPDATE articles_fts SET summary = ? WHERE rowid = ?", (summary, row[0]))
+        return True
+
+    def add_record(self, record):
+        """Index (or re-index, if changed) one scholar record. Returns True if the index changed."""
+        with self._lock:
+            changed = self._add_record(record)
+            self._db.commit()
+            return changed
+
+    def add_summary(self, title, summary):
+        """Attach a generated summary to the article titled `title`."""
+        with self._lock:
+            changed = self._add_summary(title, summary)
+            self._db.commit()
+            return changed
+
+    def _add_many(self, add, items):
+        changed = 0
+        with self._lock:
+            for count, item in enumerate(items, 1):
+                changed += add(item)
+                if count % COMMIT_EVERY == 0:
+                    self._db.commit()
+            self._db.commit()
+        return changed
+
+    def add_records(self, records):
+        """Index a stream of records, committing every COMMIT_EVERY. Returns how many changed."""
+        return self._add_many(self._add_record, records)
+
+    def add_summaries(self, abstracts):
+        """Index a stream of {"title", "abstract"} summary records. Returns how many changed."""
+        return self._add_many(lambda entry: self._add_summary(entry.get("title", ""), entry.get("abstract", "")),
+                              abstracts)
+
+    def search(self, text, limit=10, min_citations=None, year_from=None, year_to=None, raw=False):
+        """
+        Ranked hits for `text` (BM25, best first) as dicts with the article
+        metadata and a highlighted snippet. With raw=True, `text` is passed to
+        FTS5 as a query expression (AND/OR/NOT, "phrases", column:term).
+        """
+        query = text if raw else match_query(text)
+        if not query:
+            return []
+        conditions = ["articles_fts MATCH ?"]
+        params = [query]
+        for condition, value in (("a.citations >= ?", min_citations),
+                                 ("a.year >= ?", year_from),
+                                 ("a.year <= ?", year_to)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        sql = (
+            "SELECT a.title, a.authors, a.year, a.citations, a.link, rank,"
+            " snippet(articles_fts, -1, '[', ']', '...', 16)"
+            " FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid"
+            f" WHERE {' AND '.join(conditions)} ORDER BY rank LIMIT ?"
+        )
+        with self._lock:
+            rows = self._db.execute(sql, (*params, limit)).fetchall()
+        columns = ("title", "authors", "year", "citations", "link", "score", "snippet")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def optimize(self):
+        """Merge the FTS5 b-trees after large updates, for the fastest queries."""
+        with self._lock:
+            self._db.execute("INSERT INTO articles_fts(articles_fts) VALUES ('optimize')")
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and search the full-text index of scraped articles.")
+    parser.add_argument("--index", default=SEARCH_INDEX_PATH, help="index database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update", help="index new or changed records and summaries")
+    update.add_argument("results", nargs="*", default=["scholar_results.jsonl"], help="results files")
+    update.add_argument("--summaries", nargs="*", default=[], help="abstracts files from the summarizer")
+
+    search = commands.add_parser("search", help="ranked search")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=10)
+    search.add_argument("--min-citations", type=int)
+    search.add_argument("--year-from", type=int)
+    search.add_argument("--year-to", type=int)
+    search.add_argument("--raw", action="store_true", help="treat the query as an FTS5 expression")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.index)
+    if args.command == "update":
+        changed = sum(index.add_records(iter_records(path)) for path in args.results)
+        changed += sum(index.add_summaries(iter_records(path)) for path in args.summaries)
+        if changed:
+            index.optimize()
+        print(f"✅ {changed} entries updated; {len(index)} articles indexed in {args.index}")
+        return
+
+    start = time.perf_counter()
+    try:
+        hits = index.search(args.query, limit=args.limit, min_citations=args.min_citations,
+                            year_from=args.year_from, year_to=args.year_to, raw=args.raw)
+    except sqlite3.OperationalError as e:
+        parser.error(f"invalid query: {e}")
+    elapsed = (time.perf_counter() - start) * 1000
+    for rank, hit in enumerate(hits, 1):
+        print(f"{rank}. {hit['title']} ({hit['year'] or 'n.d.'}, {hit['citations'] or 0} citations)")
+        if hit["link"]:
+            print(f"   {hit['link']}")
+        print(f"   {hit['snippet']}")
+    print(f"{len(hits)} hits in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from checkpoint import content_hash, record_key
+from result_store import append_record, iter_records
+
+EMBEDDINGS_DIR = "embeddings"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_BATCH_SIZE = 64
+
+# Only the start of an article is embedded: title, abstract and keywords say what it is about
+MAX_TEXT_CHARS = 2000
+MISSING_VALUES = {"", "N/A", "No Abstract Found", "No Keywords Found"}
+
+# Nearest topics searched by the approximate index; below BRUTE_FORCE_LIMIT articles every vector is scanned
+NPROBE = 3
+BRUTE_FORCE_LIMIT = 20000
+
+# Cosine similarity above which two articles count as the same work
+SEMANTIC_DUPLICATE_THRESHOLD = 0.95
+
+# Rows scored per matrix product, to bound temporary memory on large corpora
+BLOCK_ROWS = 65536
+
+WORD_PATTERN = re.compile(r"[a-z][a-z0-9\-]+")
+LABEL_STOPWORDS = frozenset("""
+a an and are as at by for from in into is of on or the to with without via vs its their among
+study studies effect effects review trial randomized systematic meta-analysis analysis based using
+""".split())
+
+
+def article_text(record):
+    """The text embedded for a record: title, abstract and keywords."""
+    full = record.get("full_abstract") or {}
+    parts = [record.get("title", ""), record.get("abstract", ""), full.get("Abstract"), full.get("Keywords")]
+    text = ". ".join(part for part in parts if isinstance(part, str) and part.strip() not in MISSING_VALUES)
+    return text[:MAX_TEXT_CHARS]
+
+
+class SentenceEmbedder:
+    """A sentence-transformers model on CPU, loaded on first use."""
+
+    def __init__(self, model_name=EMBEDDING_MODEL, batch_size=EMBED_BATCH_SIZE, threads=None):
+        self.name = model_name
+        self.batch_size = batch_size
+        self.threads = threads
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                raise RuntimeError("The minilm embedder needs 'sentence-transformers' installed")
+            if self.threads:
+                import torch
+                torch.set_num_threads(self.threads)
+            self._model = SentenceTransformer(self.name, device="cpu")
+        return self._model
+
+    @property
+    def dim(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=self.batch_size,
+                                    normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32)
+
+
+class HashingEmbedder:
+    """
+    Signed hashed bag of words and word pairs. No model and no downloads:
+    coarser than a sentence model, but enough to group articles by vocabulary
+    when running offline.
+    """
+
+    def __init__(self, dim=512):
+        self.name = f"hashing-{dim}"
+        self.dim = dim
+
+    def _bucket(self, feature):
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = WORD_PATTERN.findall(text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                column, sign = self._bucket(feature)
+                vectors[row, column] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+
+EMBEDDERS = {"minilm": SentenceEmbedder, "hashing": HashingEmbedder}
+
+
+def embedder_for(name):
+    """The embedder that produced vectors named `name` (see meta.json), by default the sentence model."""
+    if name and name.startswith("hashing-"):
+        return HashingEmbedder(int(name[len("hashing-"):]))
+    return SentenceEmbedder(name or EMBEDDING_MODEL)
+
+
+class SemanticIndex:
+    """
+    Article embeddings in a memory-mapped float32 array, with topic clusters.
+
+    Layout of `directory`:
+      vectors.f32    one unit-length row per article (np.memmap, grown by doubling)
+      keys.jsonl     row -> record key, content hash and title (appended; last line per row wins)
+      meta.json      embedder name, dimension and row count
+      centroids.npy, clusters.json   topic centroids, per-row topic and topic labels
+
+    The clusters double as an IVF index: a query is scored only against the
+    articles of its NPROBE nearest topics. Only new or changed articles are
+    embedded on update; new ones join their nearest topic until the next
+    `cluster()`.
+    """
+
+    def __init__(self, directory=EMBEDDINGS_DIR, embedder=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.keys_path = os.path.join(directory, "keys.jsonl")
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.centroids_path = os.path.join(directory, "centroids.npy")
+        self.clusters_path = os.path.join(directory, "clusters.json")
+
+        meta = self._read_json(self.meta_path) or {}
+        # Without an explicit embedder, use the one the index was built with
+        self.embedder = embedder or embedder_for(meta.get("model"))
+        if meta.get("count") and meta["model"] != self.embedder.name:
+            raise RuntimeError(f"{directory} holds '{meta['model']}' embeddings; "
+                               f"delete it to rebuild with '{self.embedder.name}'")
+        self.count = meta.get("count", 0)
+        self.dim = meta.get("dim")
+
+        self.rows = {}    # key -> row
+        self.entries = [None] * self.count
+        for entry in iter_records(self.keys_path):
+            if entry["row"] < self.count:
+                self.rows[entry["key"]] = entry["row"]
+                self.entries[entry["row"]] = entry
+        self.vectors = self._open_vectors(self.count) if self.count else None
+
+        clusters = self._read_json(self.clusters_path) or {}
+        self.assignments = clusters.get("assignments", [])
+        self.assignments += [None] * (self.count - len(self.assignments))
+        self.labels = clusters.get("labels", [])
+        self.centroids = np.load(self.centroids_path) if self.labels and os.path.exists(self.centroids_path) else None
+        self._members = None  # topic -> rows, built on demand
+
+    @staticmethod
+    def _read_json(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path, value):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _open_vectors(self, rows):
+        capacity = len(self.entries) and os.path.getsize(self.vectors_path) // (4 * self.dim)
+        if rows > capacity:
+            capacity = max(rows, 2 * capacity, 1024)
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(capacity * self.dim * 4)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _save_meta(self):
+        self.vectors.flush()
+        self._write_json(self.meta_path, {"model": self.embedder.name, "dim": self.dim, "count": self.count})
+
+    def _write(self, batch):
+        self._members = None
+        vectors = self.embedder.embed([text for _, _, _, text in batch])
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        new_rows = sum(key not in self.rows for key, _, _, _ in batch)
+        if self.vectors is None or self.count + new_rows > self.vectors.shape[0]:
+            self.vectors = self._open_vectors(self.count + new_rows)
+        for (key, text_hash, title, _), vector in zip(batch, vectors):
+            row = self.rows.get(key)
+            if row is None:
+                row = self.rows[key] = self.count
+                self.count += 1
+                self.entries.append(None)
+                self.assignments.append(None)
+            entry = {"row": row, "key": key, "hash": text_hash, "title": title}
+            self.entries[row] = entry
+            self.vectors[row] = vector
+            append_record(self.keys_path, entry)
+            if self.centroids is not None:
+                self.assignments[row] = int(np.argmax(self.centroids @ vector))
+        self._save_meta()
+
+    def add_records(self, records, batch_size=EMBED_BATCH_SIZE):
+        """Embed new or changed records, `batch_size` texts per model call. Returns how many were embedded."""
+        batch = []
+        changed = 0
+        for record in records:
+            key = record_key(record)
+            text = article_text(record)
+            if not key or not text:
+                continue
+            text_hash = content_hash(text)
+            row = self.rows.get(key)
+            if row is not None and self.entries[row]["hash"] == text_hash:
+                continue
+            batch.append((key, text_hash, record.get("title", ""), text))
+            if len(batch) >= batch_size:
+                self._write(batch)
+                changed += len(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+            changed += len(batch)
+        if changed and self.centroids is not None:
+            self._save_clusters()
+        return changed
+
+    def _blocks(self):
+        for start in range(0, self.count, BLOCK_ROWS):
+            yield start, np.asarray(self.vectors[start:min(start + BLOCK_ROWS, self.count)])
+
+    def cluster(self, num_topics=None, iterations=25, seed=0):
+        """
+        Group the articles into topics with spherical k-means (k-means++
+        seeding) and label each topic with its most distinctive title words.
+        """
+        if not self.count:
+            return
+        num_topics = min(self.count, num_topics or max(2, round((self.count / 2) ** 0.5)))
+        rng = np.random.default_rng(seed)
+        vectors = self.vectors
+
+        # k-means++: each next centroid is drawn proportionally to its distance from the chosen ones
+        centroids = [np.asarray(vectors[rng.integers(self.count)])]
+        closest = np.full(self.count, np.inf, dtype=np.float32)
+        for _ in range(1, num_topics):
+            for start, block in self._blocks():
+                distance = 1.0 - block @ centroids[-1]
+                closest[start:start + len(block)] = np.minimum(closest[start:start + len(block)], distance)
+            weights = np.clip(closest, 0, None)
+            total = weights.sum()
+            row = rng.choice(self.count, p=weights / total) if total > 0 else rng.integers(self.count)
+            centroids.append(np.asarray(vectors[row]))
+        centroids = np.stack(centroids)
+
+        assignments = np.zeros(self.count, dtype=np.int64)
+        for iteration in range(iterations):
+            previous = assignments.copy()
+            sums = np.zeros_like(centroids)
+            for start, block in self._blocks():
+                labels = np.argmax(block @ centroids.T, axis=1)
+                assignments[start:start + len(block)] = labels
+                np.add.at(sums, labels, block)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # An emptied topic keeps its old centroid
+            centroids = np.where(norms > 0, sums / np.where(norms > 0, norms, 1), centroids)
+            if iteration and np.array_equal(assignments, previous):
+                break
+
+        self.centroids = centroids.astype(np.float32)
+        self._members = None
+        self.assignments = assignments.tolist()
+        self.labels = self._label_topics(num_topics)
+        self._save_clusters()
+
+    def _label_topics(self, num_topics, words_per_label=3):
+        # Words frequent in a topic's titles but rare elsewhere name the topic
+        topic_words = [Counter() for _ in range(num_topics)]
+        overall = Counter()
+        for row, topic in enumerate(self.assignments):
+            words = {w for w in WORD_PATTERN.findall(self.entries[row]["title"].lower()) if w not in LABEL_STOPWORDS}
+            topic_words[topic].update(words)
+            overall.update(words)
+        labels = []
+        for topic, counts in enumerate(topic_words):
+            size = max(1, sum(1 for t in self.assignments if t == topic))
+            scored = sorted(counts, key=lambda w: (-counts[w] / size * np.log(self.count / overall[w]), w))
+            labels.append(", ".join(scored[:words_per_label]) or f"topic {topic + 1}")
+        return labels
+
+    def _save_clusters(self):
+        np.save(self.centroids_path, self.centroids)
+        self._write_json(self.clusters_path, {"assignments": self.assignments, "labels": self.labels})
+
+    def topic_of(self, key):
+        """Label of the topic of the article with record key `key`, or None if unclustered."""
+        row = self.rows.get(key)
+        if row is None or not self.labels or self.assignments[row] is None:
+            return None
+        return self.labels[self.assignments[row]]
+
+    def topics(self):
+        """{topic label: [record keys]}, largest topics first."""
+        groups = {}
+        for row, topic in enumerate(self.assignments):
+            if topic is not None:
+                groups.setdefault(self.labels[topic], []).append(self.entries[row]["key"])
+        return dict(sorted(groups.items(), key=lambda item: -len(item[1])))
+
+    def _topic_rows(self):
+        if self._members is None:
+            self._members = {}
+            for row, topic in enumerate(self.assignments):
+                self._members.setdefault(topic, []).append(row)
+        return self._members
+
+    def _candidate_rows(self, vector, nprobe):
+        if self.centroids is None or self.count <= BRUTE_FORCE_LIMIT:
+            return None
+        members = self._topic_rows()
+        nearest = np.argsort(-(self.centroids @ vector))[:nprobe]
+        return np.array(sorted(row for topic in nearest.tolist() for row in members.get(topic, ())), dtype=np.int64)
+
+    def search(self, vector, k=10, nprobe=NPROBE, exclude=()):
+        """The `k` articles most similar to `vector`, as (key, title, cosine similarity), best first."""
+        if not self.count:
+            return []
+        rows = self._candidate_rows(vector, nprobe)
+        if rows is None:
+            scores = np.concatenate([block @ vector for _, block in self._blocks()])
+            rows = np.arange(self.count)
+        else:
+            scores = np.asarray(self.vectors[rows]) @ vector
+        hits = []
+        for i in np.argsort(-scores):
+            entry = self.entries[rows[i]]
+            if entry["key"] in exclude:
+                continue
+            hits.append((entry["key"], entry["title"], float(scores[i])))
+            if len(hits) == k:
+                break
+        return hits
+
+    def more_like_this(self, key=None, text=None, k=10, nprobe=NPROBE):
+        """Articles similar to an indexed article (by record key) or to free `text`."""
+        if key is not None:
+            key = key.strip().lower()
+            if key not in self.rows:
+                raise KeyError(f"'{key}' is not in the semantic index")
+            return self.search(np.asarray(self.vectors[self.rows[key]]), k, nprobe, exclude={key})
+        return self.search(self.embedder.embed([text])[0], k, nprobe)
+
+    def duplicate_of(self, key, candidates, threshold=SEMANTIC_DUPLICATE_THRESHOLD):
+        """
+        A key from the set `candidates` (e.g. the records kept so far) whose article
+        is nearly identical to `key`'s, else None. Only articles of the same
+        topic are compared, so this stays cheap on large corpora.
+        """
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        topic = self.assignments[row] if self.labels else None
+        pool = range(self.count) if topic is None else self._topic_rows()[topic]
+        others = [other for other in pool if other != row and self.entries[other]["key"] in candidates]
+        if not others:
+            return None
+        scores = np.asarray(self.vectors[others]) @ np.asarray(self.vectors[row])
+        best = int(np.argmax(scores))
+        return self.entries[others[best]]["key"] if scores[best] >= threshold else None
+
+    def __len__(self):
+        return self.count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embed articles, cluster them into topics and find similar ones.")
+    parser.add_argument("--dir", default=EMBEDDINGS_DIR, help="index directory")
+    parser.add_argument("--embedder", choices=sorted(EMBEDDERS),
+                        help="embedding backend (default: the index's, or minilm for a new index)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update", help="embed new or changed records and refresh the topics")
+    update.add_argument("results", nargs="*", default=["scholar_results.jsonl"])
+    update.add_argument("--topics", type=int, help="number of topics (default: sqrt(articles / 2))")
+
+    similar = commands.add_parser("similar", help="more like this")
+    similar.add_argument("title_or_text")
+    similar.add_argument("--text", action="store_true", help="treat the argument as free text, not a title")
+    similar.add_argument("--limit", type=int, default=10)
+
+    commands.add_parser("topics", help="list the topics and their articles")
+    args = parser.parse_args(argv)
+
+    index = SemanticIndex(args.dir, EMBEDDERS[args.embedder]() if args.embedder else None)
+    if args.command == "update":
+        changed = sum(index.add_records(iter_records(path)) for path in args.results)
+        if changed or args.topics:
+            index.cluster(args.topics)
+        print(f"✅ {changed} articles embedded; {len(index)} articles in {len(index.labels)} topics")
+    elif args.command == "similar":
+        try:
+            hits = index.more_like_this(text=args.title_or_text, k=args.limit) if args.text \
+                else index.more_like_this(key=args.title_or_text, k=args.limit)
+        except KeyError as e:
+            parser.error(str(e.args[0]))
+        for key, title, score in hits:
+            print(f"{score:.3f}  {title}")
+    else:
+        for label, keys in index.topics().items():
+            print(f"{label} ({len(keys)})")
+            for key in keys:
+                print(f"   {index.entries[index.rows[key]]['title']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blob_store import INDEX_ENTRY, BlobStore
+
+
+def test_partial_index_entry_is_cut_off(tmp_path):
+    store = BlobStore(str(tmp_path))
+    first = store.put("first text " * 50)
+    store.close()
+    # A crash mid-append leaves part of an entry behind
+    with open(os.path.join(str(tmp_path), "index"), "ab") as f:
+        f.write(b"\x01" * 10)
+
+    store = BlobStore(str(tmp_path))
+    assert os.path.getsize(store.index_path) == INDEX_ENTRY.size
+    second = store.put("second text " * 50)
+    store.close()
+
+    reopened = BlobStore(str(tmp_path))
+    assert reopened.get(first) == "first text " * 50
+    assert reopened.get(second) == "second text " * 50
+    assert len(reopened) == 2
+    reopened.close()
@@ -0,0 +1,46 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Abstraction"))
+
+import clean
+from blob_store import BlobStore, is_ref
+from checkpoint import Checkpoint
+
+
+class FakeNlp:
+    """Splits on '. ' instead of running spaCy."""
+
+    def pipe(self, inputs, as_tuples=True, **kwargs):
+        for text, context in inputs:
+            sents = [SimpleNamespace(text=part) for part in text.split(". ") if part]
+            yield _Doc(sents), context
+
+
+class _Doc:
+    def __init__(self, sents):
+        self.sents = sents
+
+    def __len__(self):
+        return len(self.sents)
+
+
+def test_checkpoint_stores_blob_reference(tmp_path, monkeypatch):
+    monkeypatch.setattr(clean, "get_nlp", lambda segmenter=None: FakeNlp())
+    store = BlobStore(str(tmp_path / "blobs"))
+    checkpoint = Checkpoint("clean", directory=str(tmp_path / "checkpoints"))
+    text = ". ".join(f"Exercise snacks improved fitness in sentence number {i}" for i in range(20))
+    records = [{"title": "Snacks", "full_abstract": {"Full Text Content": text}}]
+
+    cleaned = list(clean.clean_records(iter(records), checkpoint=checkpoint, store=store))
+    ref = cleaned[0]["full_abstract"]["Cleaned Text Content"]
+    assert is_ref(ref)
+    assert "Cleaned Text Content" not in records[0]["full_abstract"]
+    assert checkpoint.entries["snacks"]["output"] == ref
+
+    # A rerun takes the reference from the checkpoint without writing it again
+    size = os.path.getsize(checkpoint.path)
+    again = list(clean.clean_records(iter(records), checkpoint=checkpoint, store=store))
+    assert again[0]["full_abstract"]["Cleaned Text Content"] == ref
+    assert os.path.getsize(checkpoint.path) == size
@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup_index import DedupIndex
+
+
+def record(title, link, doi=None):
+    full = {"DOI": doi} if doi else {}
+    return {"title": title, "link": link, "abstract": "", "full_abstract": full}
+
+
+def test_unsaved_claim_is_not_persisted(tmp_path):
+    path = str(tmp_path / "dedup.jsonl")
+    index = DedupIndex(path)
+    result = record("Exercise snacks and glucose", "https://example.org/a")
+    record_id, is_duplicate = index.check_and_add(result, persist=False)
+    assert not is_duplicate
+    assert index.check_and_add(record("Exercise snacks and glucose", "https://example.org/b"),
+                               persist=False) == (record_id, True)
+
+    # Interrupted before the page was saved: the next run must fetch it again
+    assert DedupIndex(path).check_and_add(result, persist=False)[1] is False
+
+
+def test_update_persists_claim(tmp_path):
+    path = str(tmp_path / "dedup.jsonl")
+    index = DedupIndex(path)
+    result = record("Stair climbing snacks", "https://example.org/a")
+    record_id, _ = index.check_and_add(result, persist=False)
+    result["full_abstract"] = {"DOI": "10.1000/xyz"}
+    assert index.update(record_id, result) is None
+
+    reopened = DedupIndex(path)
+    assert reopened.find_duplicate(record("Other title", "https://example.org/c", doi="10.1000/XYZ")) == record_id
+    assert reopened.find_duplicate(record("Stair climbing snacks", "https://example.org/z")) == record_id
+
+
+def test_update_drops_claim_that_duplicates_saved_record(tmp_path):
+    path = str(tmp_path / "dedup.jsonl")
+    index = DedupIndex(path)
+    index.check_and_add(record("Original paper", "https://example.org/o", doi="10.1000/dup"))
+    claimed = record("Preprint version", "https://example.org/p")
+    record_id, _ = index.check_and_add(claimed, persist=False)
+    claimed["full_abstract"] = {"DOI": "10.1000/dup"}
+    assert index.update(record_id, claimed) == "original paper"
+    assert DedupIndex(path).find_duplicate(record("Preprint version", "https://example.org/q")) is None
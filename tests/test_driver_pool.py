@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from driver_pool import DriverPool, FakeDriver, FakeDriverError
+
+
+@pytest.fixture
+def pages(tmp_path):
+    mapping = {}
+    for i in range(20):
+        path = tmp_path / f"page{i}.html"
+        path.write_text(f"<html><body>page {i}</body></html>", encoding="utf-8")
+        mapping[f"https://example.org/{i}"] = str(path)
+    return mapping
+
+
+class CountingFactory:
+    def __init__(self, pages):
+        self.pages = pages
+        self.drivers = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        driver = FakeDriver(pages=self.pages)
+        with self.lock:
+            self.drivers.append(driver)
+        return driver
+
+
+def load(pool, url):
+    with pool.borrow(timeout=5) as driver:
+        driver.get(url)
+        return driver.page_source
+
+
+def test_drivers_are_reused(pages):
+    factory = CountingFactory(pages)
+    with DriverPool(factory, size=2, max_pages=50) as pool:
+        for url in list(pages)[:5]:
+            assert "page" in load(pool, url)
+    assert len(factory.drivers) == 1
+    assert factory.drivers[0].closed
+
+
+def test_driver_recycled_after_max_pages(pages):
+    factory = CountingFactory(pages)
+    with DriverPool(factory, size=1, max_pages=3) as pool:
+        for url in list(pages)[:7]:
+            load(pool, url)
+    assert len(factory.drivers) == 3
+    assert [d.pages_loaded for d in factory.drivers] == [3, 3, 1]
+    assert all(d.closed for d in factory.drivers)
+
+
+def test_crashed_driver_is_replaced(pages):
+    factory = CountingFactory(pages)
+    with DriverPool(factory, size=1) as pool:
+        with pytest.raises(FakeDriverError):
+            load(pool, "https://example.org/missing")
+        assert factory.drivers[0].closed
+        assert "page 0" in load(pool, "https://example.org/0")
+    assert len(factory.drivers) == 2
+
+
+def test_more_workers_than_drivers_with_discards(pages):
+    # Drivers are discarded every other page; waiters must still get a slot
+    factory = CountingFactory(pages)
+    pool = DriverPool(factory, size=2, max_pages=2)
+    urls = list(pages) + ["https://example.org/missing"] * 4
+    errors = []
+
+    def worker(chunk):
+        for url in chunk:
+            try:
+                load(pool, url)
+            except FakeDriverError:
+                pass
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(urls[i::4],), daemon=True) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert not any(t.is_alive() for t in threads)
+    assert not errors
+    pool.close()
+    assert pool._created == 0
+    assert all(d.closed for d in factory.drivers)
+
+
+def test_acquire_times_out_when_exhausted(pages):
+    pool = DriverPool(CountingFactory(pages), size=1)
+    with pool.borrow():
+        with pytest.raises(TimeoutError):
+            with pool.borrow(timeout=0.05):
+                pass
+    pool.close()
@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_cache import HtmlCache
+
+
+def test_entries_survive_reopen_without_flush(tmp_path):
+    cache = HtmlCache(str(tmp_path))
+    cache.put("https://example.org/a?utm_source=x", "<html>a</html>")
+    cache.put("https://example.org/b", "<html>b</html>")
+    assert not os.path.exists(cache.index_path)
+
+    reopened = HtmlCache(str(tmp_path))
+    assert reopened.get("https://example.org/a") == "<html>a</html>"
+    assert reopened.get("https://example.org/b") == "<html>b</html>"
+    reopened.close()
+    assert os.path.exists(reopened.index_path)
+    assert not os.path.exists(reopened.log_path)
+    assert len(HtmlCache(str(tmp_path))) == 2
+
+
+def test_truncated_log_line_is_ignored(tmp_path):
+    cache = HtmlCache(str(tmp_path))
+    cache.put("https://example.org/a", "<html>a</html>")
+    with open(cache.log_path, "a", encoding="utf-8") as f:
+        f.write('{"url": "https://example.org/b", "ent')
+    assert HtmlCache(str(tmp_path)).get("https://example.org/a") == "<html>a</html>"
+
+
+def test_oldest_pages_evicted_and_oversized_pages_skipped(tmp_path):
+    cache = HtmlCache(str(tmp_path), max_bytes=25)
+    cache.put("https://example.org/1", "x" * 10)
+    cache.put("https://example.org/2", "y" * 10)
+    cache.put("https://example.org/3", "z" * 10)
+    assert "https://example.org/1" not in cache
+    assert "https://example.org/3" in cache
+
+    assert cache.put("https://example.org/big", "w" * 100) is None
+    assert "https://example.org/big" not in cache
+    assert len(cache) == 2
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [entry["path"] for entry in cache.index.values()] + [HtmlCache.LOG_NAME])
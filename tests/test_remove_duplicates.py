@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from removeDuplicates import unique_records
+
+
+class FakeSemanticIndex:
+    """Treats records with the same "topic" field as semantic duplicates."""
+
+    def __init__(self):
+        self.topics = {}
+        self.added = []
+
+    def add_records(self, records):
+        for record in records:
+            self.topics[record["title"].strip().lower()] = record["topic"]
+        self.added.append(len(records))
+
+    def duplicate_of(self, key, candidates):
+        return next((other for other in candidates if self.topics[other] == self.topics[key]), None)
+
+
+def test_semantic_duplicates_are_dropped_in_order():
+    titles = ["Stair climbing snacks", "Vigorous stair climbing bouts", "Breaking up sitting time",
+              "Interrupting prolonged sitting", "Glucose after exercise snacks"]
+    records = [{"title": title, "link": f"https://example.org/{i}", "topic": i // 2} for i, title in enumerate(titles)]
+    records.append({"title": "Stair climbing snacks", "link": "https://example.org/0"})
+    index = FakeSemanticIndex()
+    kept = [r["title"] for r in unique_records(iter(records), semantic_index=index, batch_size=2)]
+    assert kept == [titles[0], titles[2], titles[4]]
+    assert index.added == [2, 2, 1]
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_store import iter_records, tee_records
+
+
+def test_tee_writes_records_as_yielded(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    records = [{"id": i, "full_abstract": {"Full Text Content": "text"}} for i in range(3)]
+    for record in tee_records(path, records):
+        # A downstream stage mutating the record must not change the tee'd copy
+        record["full_abstract"]["Cleaned Text Content"] = "cleaned"
+    written = list(iter_records(path))
+    assert [r["id"] for r in written] == [0, 1, 2]
+    assert all("Cleaned Text Content" not in r["full_abstract"] for r in written)
+
+
+def test_abandoned_tee_leaves_store_untouched(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    stream = tee_records(path, ({"id": i} for i in range(5)))
+    next(stream)
+    stream.close()
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + ".tmp")
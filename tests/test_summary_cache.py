@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Abstraction"))
+
+from summary_cache import SummaryCache
+
+
+def total_size(cache):
+    return cache._db.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+
+
+def test_hits_are_not_write_transactions(tmp_path):
+    cache = SummaryCache(str(tmp_path / "cache.sqlite"))
+    cache.put("a", "summary a")
+    changes = cache._db.total_changes
+    assert cache.get("a") == "summary a"
+    assert cache._db.total_changes == changes
+    assert not cache._db.in_transaction
+    cache.close()
+
+
+def test_total_size_tracked_and_lru_evicted(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = SummaryCache(path, max_bytes=30)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    cache.put("a", "x" * 12)
+    assert total_size(cache) == 22
+    cache.get("a")  # b is now the least recently used
+    cache.put("c", "z" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 12
+    assert total_size(cache) == 22
+    cache.close()
+
+    reopened = SummaryCache(path, max_bytes=30)
+    assert total_size(reopened) == 22
+    assert len(reopened) == 2
+    reopened.close()